@@ -2,6 +2,8 @@
 撲克牌基礎類別
 """
 
+from itertools import permutations
+
 class Card:
     """撲克牌類別"""
     
@@ -18,6 +20,7 @@ class Card:
         self.suit = suit
         self.value = self.RANKS.index(rank) + 2  # 2=2, 3=3, ..., A=14
         self.low_value = 14 if rank == 'A' else self.value  # A在低牌中為1
+        self.code = (self.value - 2) * 4 + self.SUITS.index(suit)  # 整數編碼 0-51
     
     def __str__(self):
         return f"{self.rank}{self.suit}"
@@ -36,21 +39,107 @@ class Deck:
     
     def __init__(self):
         self.cards = []
+        self.dead_mask = 0  # 已移除牌的位元遮罩，第code位為1表示該牌已不在牌堆
         self.reset()
     
     def reset(self):
         """重置牌堆"""
         self.cards = [Card(rank, suit) for suit in Card.SUITS for rank in Card.RANKS]
+        self.dead_mask = 0
     
     def remove_cards(self, cards):
-        """從牌堆中移除指定牌"""
+        """從牌堆中移除指定牌（先標記到位元遮罩，再一次過濾牌堆）"""
         for card in cards:
-            if card in self.cards:
-                self.cards.remove(card)
+            self.dead_mask |= 1 << card.code
+        dead_mask = self.dead_mask
+        self.cards = [card for card in self.cards if not dead_mask >> card.code & 1]
     
     def get_remaining_cards(self):
         """獲取剩餘的牌"""
         return self.cards.copy()
+    
+    def get_remaining_codes(self):
+        """獲取剩餘的牌（整數編碼，由小到大）"""
+        return remaining_codes(self.dead_mask)
+
+def codes_to_mask(codes):
+    """整數編碼列表 -> 52位元的牌遮罩"""
+    mask = 0
+    for code in codes:
+        mask |= 1 << code
+    return mask
+
+def mask_to_codes(mask):
+    """52位元的牌遮罩 -> 整數編碼列表（由小到大）"""
+    codes = []
+    while mask:
+        low_bit = mask & -mask
+        codes.append(low_bit.bit_length() - 1)
+        mask ^= low_bit
+    return codes
+
+def remaining_codes(dead_mask):
+    """不在dead_mask中的牌（整數編碼，由小到大）"""
+    return [code for code in range(52) if not dead_mask >> code & 1]
+
+def partial_shuffle(buffer, count, random_func):
+    """
+    部分Fisher–Yates洗牌：原地把buffer前count個位置換成不放回的隨機抽樣
+    buffer可在多次抽樣間重複使用（任何排列再做部分洗牌仍是均勻抽樣），不配置新列表
+    """
+    size = len(buffer)
+    for i in range(count):
+        j = i + int(random_func() * (size - i))
+        buffer[i], buffer[j] = buffer[j], buffer[i]
+
+# 整數編碼：code = 牌面索引 * 4 + 花色索引，牌面索引 0=2 ... 12=A
+# 模擬迴圈內只使用整數，僅在API邊界與Card互相轉換
+
+def card_to_int(card):
+    """Card -> 整數編碼 (0-51)"""
+    return card.code
+
+def int_to_card(code):
+    """整數編碼 (0-51) -> Card"""
+    return Card(Card.RANKS[code >> 2], Card.SUITS[code & 3])
+
+def cards_to_ints(cards):
+    """多張Card -> 整數編碼列表"""
+    return [card.code for card in cards]
+
+def ints_to_cards(codes):
+    """整數編碼列表 -> 多張Card"""
+    return [int_to_card(code) for code in codes]
+
+# 花色同構：4種花色的24種排列，perm[s]為原花色s映射後的花色
+SUIT_PERMUTATIONS = tuple(permutations(range(4)))
+
+def permute_suits(codes, suit_permutation):
+    """將整數編碼的牌依花色排列映射"""
+    return [(code & ~3) | suit_permutation[code & 3] for code in codes]
+
+def canonicalize_deal(hands_codes, board_codes, suit_isomorphism=True):
+    """
+    將牌局 (玩家手牌, 公共牌) 映射到同構類的代表元
+    每位玩家手牌排序、公共牌排序、玩家依手牌排序；suit_isomorphism為True時
+    再嘗試全部24種花色排列取字典序最小者，只差花色排列的牌局勝率相同，會得到同一個代表元
+    
+    Returns:
+        tuple: (canonical_hands, canonical_board, player_order, suit_permutation)
+            player_order[k]為代表元中第k位玩家在原始輸入中的索引
+            suit_permutation[s]為原花色s在代表元中的花色
+    """
+    best = None
+    for suit_permutation in (SUIT_PERMUTATIONS if suit_isomorphism else SUIT_PERMUTATIONS[:1]):
+        hands = [tuple(sorted(permute_suits(hand, suit_permutation))) for hand in hands_codes]
+        board = tuple(sorted(permute_suits(board_codes, suit_permutation)))
+        player_order = sorted(range(len(hands)), key=hands.__getitem__)
+        candidate = (board, tuple(hands[i] for i in player_order))
+        if best is None or candidate < best[0]:
+            best = (candidate, player_order, suit_permutation)
+    
+    (canonical_board, canonical_hands), player_order, suit_permutation = best
+    return canonical_hands, canonical_board, player_order, suit_permutation
 
 def parse_card(card_str):
     """
@@ -84,4 +173,4 @@ def parse_cards(cards_str):
         return []
     
     card_strings = cards_str.strip().split()
-    return [parse_card(card_str) for card_str in card_strings]
\ No newline at end of file
+    return [parse_card(card_str) for card_str in card_strings]
@@ -0,0 +1,245 @@
+"""
+奧瑪哈高低牌勝率結果快取
+記憶體LRU（有容量上限）加上可選的SQLite磁碟層，讓結果在重啟後保留並可由多個工作進程共用
+"""
+
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from card import cards_to_ints, canonicalize_deal
+from hand_range import HandRange
+from equity_calculator import OmahaHiLoEquityCalculator
+
+def make_cache_key(canonical_hands, canonical_board, seed=None, num_simulations=None, workers=1):
+    """
+    代表元 -> 快取鍵字串
+    指定種子時結果只對相同的模擬次數與workers逐位元相同，因此一併放入鍵
+    """
+    hands_part = '|'.join(','.join(map(str, hand)) for hand in canonical_hands)
+    board_part = ','.join(map(str, canonical_board))
+    key = f'{hands_part};{board_part}'
+    if seed is not None:
+        key += f';seed={seed};n={num_simulations};w={workers}'
+    return key
+
+def _replaces(players_stats, trials, entry):
+    """新結果是否應取代既有的快取記錄：窮舉結果不會被取代，否則保留模擬次數較多的"""
+    if entry is None:
+        return True
+    old_stats, old_trials = entry
+    if old_stats[0]['exact']:
+        return False
+    return players_stats[0]['exact'] or trials >= old_trials
+
+class EquityCache:
+    """勝率結果快取：每筆記錄保存代表元玩家順序的統計與模擬次數"""
+    
+    def __init__(self, max_entries=4096, db_path=None):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS equity_cache '
+                '(key TEXT PRIMARY KEY, trials INTEGER NOT NULL, result TEXT NOT NULL)'
+            )
+            self._db.commit()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key):
+        """查詢快取，返回 (players_stats, trials) 或None；磁碟命中時回填記憶體層"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+            if self._db is None:
+                return None
+            row = self._db.execute('SELECT trials, result FROM equity_cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            entry = (json.loads(row[1]), row[0])
+            self._remember(key, entry)
+            return entry
+    
+    def put(self, key, players_stats, trials):
+        """寫入快取；同一個鍵優先保留窮舉結果，其次是模擬次數較多的結果"""
+        with self._lock:
+            if not _replaces(players_stats, trials, self._entries.get(key)):
+                return
+            self._remember(key, (players_stats, trials))
+            if self._db is not None:
+                # 讀取與寫入在同一個交易中，多個進程同時寫入同一個鍵時不會互相覆蓋
+                self._db.execute('BEGIN IMMEDIATE')
+                try:
+                    row = self._db.execute('SELECT trials, result FROM equity_cache WHERE key = ?',
+                                           (key,)).fetchone()
+                    if _replaces(players_stats, trials, row and (json.loads(row[1]), row[0])):
+                        self._db.execute('INSERT OR REPLACE INTO equity_cache (key, trials, result) '
+                                         'VALUES (?, ?, ?)', (key, trials, json.dumps(players_stats)))
+                    self._db.commit()
+                except Exception:
+                    self._db.rollback()
+                    raise
+    
+    def clear(self):
+        """清空記憶體層與磁碟層"""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM equity_cache')
+                self._db.commit()
+    
+    def record_lookup(self, hit):
+        """累計命中/未命中次數"""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def _remember(self, key, entry):
+        """放入記憶體LRU，超過容量時淘汰最久未使用的記錄（呼叫者需持有鎖）"""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+class CachedEquityCalculator:
+    """在OmahaHiLoEquityCalculator.calculate_equity前加上一層結果快取，其餘方法直接轉交"""
+    
+    def __init__(self, calculator=None, cache=None):
+        self.calculator = calculator if calculator is not None else OmahaHiLoEquityCalculator()
+        self.cache = cache if cache is not None else EquityCache()
+    
+    def __getattr__(self, name):
+        return getattr(self.calculator, name)
+    
+    def calculate_equity(self, players_hands, board_cards=None, num_simulations=10000, **kwargs):
+        """
+        計算勝率（參數同OmahaHiLoEquityCalculator.calculate_equity）
+        快取記錄滿足以下任一條件即直接返回：窮舉結果、模擬次數不少於要求、
+        或指定target_stderr時所有玩家的標準誤都已達標（要求exact=True時只接受窮舉結果）；傳入自訂rng或有玩家為手牌範圍時不使用快取
+        """
+        if board_cards is None:
+            board_cards = []
+        if self._bypass(players_hands, kwargs):
+            return self.calculator.calculate_equity(players_hands, board_cards, num_simulations, **kwargs)
+        
+        key, order, cached = self._lookup(players_hands, board_cards, num_simulations, kwargs)
+        if cached is not None:
+            return cached
+        
+        results = self.calculator.calculate_equity(players_hands, board_cards, num_simulations, **kwargs)
+        if self._completed(results, num_simulations, kwargs):
+            self._store(key, order, results)
+        return results
+    
+    def iter_equity(self, players_hands, board_cards=None, num_simulations=10000, **kwargs):
+        """
+        逐批計算勝率（參數同OmahaHiLoEquityCalculator.iter_equity）
+        快取命中時只產生一次最終結果；完整跑完的結果寫入快取，
+        中途停止迭代或因取消、時間上限而停止的不寫入
+        """
+        if board_cards is None:
+            board_cards = []
+        if self._bypass(players_hands, kwargs):
+            return self.calculator.iter_equity(players_hands, board_cards, num_simulations, **kwargs)
+        
+        key, order, cached = self._lookup(players_hands, board_cards, num_simulations, kwargs)
+        if cached is not None:
+            return self._replay(cached)
+        
+        snapshots = self.calculator.iter_equity(players_hands, board_cards, num_simulations, **kwargs)
+        return self._store_last(key, order, snapshots, num_simulations, kwargs)
+    
+    @staticmethod
+    def _bypass(players_hands, kwargs):
+        """是否略過快取：自訂rng的亂數狀態無法作為鍵，手牌範圍無法做花色標準化"""
+        return kwargs.get('rng') is not None or any(isinstance(hand, HandRange) for hand in players_hands)
+    
+    def _lookup(self, players_hands, board_cards, num_simulations, kwargs):
+        """
+        計算快取鍵並查詢快取
+        
+        Returns:
+            tuple: (key, order, results)，未命中時results為None
+        """
+        seed = kwargs.get('seed')
+        # 未指定種子時以花色同構類為鍵；指定種子時花色排列會改變抽到的牌面，只做排序標準化
+        canonical_hands, canonical_board, order, _ = canonicalize_deal(
+            [cards_to_ints(hand) for hand in players_hands], cards_to_ints(board_cards),
+            suit_isomorphism=seed is None)
+        key = make_cache_key(canonical_hands, canonical_board, seed, num_simulations, kwargs.get('workers', 1))
+        
+        entry = self.cache.get(key)
+        if entry is not None and self._satisfies(entry, num_simulations, kwargs.get('target_stderr'),
+                                                 kwargs.get('exact')):
+            self.cache.record_lookup(True)
+            return key, order, self._to_results(entry[0], order)
+        self.cache.record_lookup(False)
+        return key, order, None
+    
+    def _store(self, key, order, results):
+        """依代表元順序寫入快取"""
+        players_stats = [results[f'player_{i+1}'] for i in order]
+        self.cache.put(key, players_stats, players_stats[0]['trials'])
+    
+    @staticmethod
+    def _replay(results):
+        """快取命中時的迭代器：只產生一次最終結果"""
+        trials = results['player_1']['trials']
+        yield trials, trials, results
+    
+    def _store_last(self, key, order, snapshots, num_simulations, kwargs):
+        """轉交每次的進度，迭代正常結束且計算完整時將最後的結果寫入快取"""
+        results = None
+        for snapshot in snapshots:
+            results = snapshot[2]
+            yield snapshot
+        if results is not None and self._completed(results, num_simulations, kwargs):
+            self._store(key, order, results)
+    
+    @staticmethod
+    def _completed(results, num_simulations, kwargs):
+        """
+        結果是否為完整跑完的計算（可寫入快取）：窮舉結果、跑滿num_simulations次的蒙特卡羅、
+        或達到target_stderr而提前停止；因取消或時間上限中途停止的結果都不符合
+        """
+        first_stats = results['player_1']
+        if first_stats['exact']:
+            return True
+        if kwargs.get('exact'):
+            return False
+        target_stderr = kwargs.get('target_stderr')
+        if target_stderr is not None and max(stats['equity_stderr'] for stats in results.values()) <= target_stderr:
+            return True
+        return first_stats['trials'] == num_simulations
+    
+    @staticmethod
+    def _satisfies(entry, num_simulations, target_stderr, exact=None):
+        """快取記錄是否足以回應這次請求；要求窮舉（exact=True）時只接受窮舉結果"""
+        players_stats, trials = entry
+        if exact:
+            return players_stats[0]['exact']
+        if players_stats[0]['exact'] or trials >= num_simulations:
+            return True
+        if target_stderr is not None:
+            return max(stats['equity_stderr'] for stats in players_stats) <= target_stderr
+        return False
+    
+    @staticmethod
+    def _to_results(players_stats, order):
+        """代表元順序的統計 -> 依原始玩家順序命名的結果字典"""
+        ordered_stats = [None] * len(order)
+        for canonical_index, player_index in enumerate(order):
+            ordered_stats[player_index] = dict(players_stats[canonical_index])
+        return {f'player_{i+1}': stats for i, stats in enumerate(ordered_stats)}
@@ -3,36 +3,350 @@
 """
 
 import random
-from itertools import combinations
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from itertools import combinations, islice
+from math import comb, sqrt
 from collections import defaultdict
-from card import Card, Deck, parse_cards
-from hand_evaluator import HandEvaluator
+from concurrent.futures import ProcessPoolExecutor
+from card import (Card, parse_cards, cards_to_ints, ints_to_cards, codes_to_mask, mask_to_codes,
+                  remaining_codes, partial_shuffle)
+from hand_range import HandRange, deal_ranges
+from hand_evaluator import BoardContext, HandEvaluator
+
+# 計數欄位（可在分片之間直接相加）
+COUNTER_FIELDS = ('hi_wins', 'lo_wins', 'scoops', 'splits', 'quarters', 'three_quarters',
+                  'total_value', 'total_value_sq')
+
+# 逐街勝率的各街名稱與該街的公共牌數
+STREETS = (('preflop', 0), ('flop', 3), ('turn', 4), ('river', 5))
+
+# 可中途停止的窮舉以打亂順序的牌面列表執行，超過這個數量時改為蒙特卡羅
+MAX_SHUFFLED_RUNOUTS = 200000
+
+# 手牌範圍的模擬另外累計的權重欄位（序列重要性抽樣）：權重和、權重平方和，
+# 以及每位玩家底池份額乘上權重平方、份額平方乘上權重平方的和（估計標準誤用）
+RANGE_WEIGHT_FIELDS = ('weight', 'weight_sq', 'value_weight_sq', 'value_sq_weight_sq')
+
+# 常駐的進程池，跨多次calculate_equity呼叫重複使用，避免每次請求都付出fork/spawn成本
+_process_pool = None
+_process_pool_workers = 0
+_process_pool_lock = threading.Lock()
+# 進程池 -> 正在使用它的呼叫數；被取代或關閉的池等到沒有人使用才真正關閉
+_process_pool_users = {}
+# 子進程內依評估後端快取的計算器
+_shard_calculators = {}
+
+@contextmanager
+def process_pool(workers):
+    """
+    在with區塊內使用至少有workers個工作進程的常駐進程池
+    分片數由呼叫者的workers決定，池中的進程較多時結果不變；需要更多進程時改建較大的池，
+    舊池等到所有仍在使用的呼叫都離開with區塊才關閉，其他執行緒提交到一半的分片不受影響
+    """
+    global _process_pool, _process_pool_workers
+    with _process_pool_lock:
+        if _process_pool is None or _process_pool_workers < workers:
+            old_pool = _process_pool
+            _process_pool = ProcessPoolExecutor(max_workers=workers)
+            _process_pool_workers = workers
+            _release_pool(old_pool, 0)
+        pool = _process_pool
+        _process_pool_users[pool] = _process_pool_users.get(pool, 0) + 1
+    try:
+        yield pool
+    finally:
+        with _process_pool_lock:
+            _release_pool(pool, 1)
+
+def _release_pool(pool, count):
+    """減少進程池的使用數，已不是常駐池且沒有人使用時關閉（呼叫者需持有鎖）"""
+    if pool is None:
+        return
+    users = _process_pool_users.pop(pool, 0) - count
+    if users:
+        _process_pool_users[pool] = users
+    elif pool is not _process_pool:
+        pool.shutdown(wait=False)
+
+def shutdown_process_pool():
+    """關閉常駐進程池（仍在使用中的呼叫結束後才關閉）"""
+    global _process_pool, _process_pool_workers
+    with _process_pool_lock:
+        pool = _process_pool
+        _process_pool = None
+        _process_pool_workers = 0
+        _release_pool(pool, 0)
+
+NUM_COUNTER_FIELDS = len(COUNTER_FIELDS)
+
+# (高牌獲勝人數, 低牌獲勝人數, 是否贏高牌, 是否贏低牌) -> 各計數欄位的增量
+_pot_share_rows = {}
+
+def pot_share_row(hi_count, lo_count, is_hi_winner, is_lo_winner):
+    """
+    查詢一位獲勝者在此牌面的各計數增量（順序同COUNTER_FIELDS），首次查詢時計算並快取
+    lo_count為0表示沒有人有低牌
+    """
+    key = (hi_count, lo_count, is_hi_winner, is_lo_winner)
+    row = _pot_share_rows.get(key)
+    if row is None:
+        row = _pot_share_rows[key] = _build_pot_share_row(hi_count, lo_count, is_hi_winner, is_lo_winner)
+    return row
+
+def _build_pot_share_row(hi_count, lo_count, is_hi_winner, is_lo_winner):
+    """依底池分配規則計算一位玩家的計數增量"""
+    hi_wins = lo_wins = scoops = splits = quarters = three_quarters = 0
+    
+    # 分配獎勵和統計勝利類型
+    hi_pot_value = 0.5 if lo_count else 1.0  # 如果沒有低牌，高牌得整個底池
+    lo_pot_value = 0.5 if lo_count else 0.0   # 只有在有低牌時才有低牌底池
+    pot_share = 0
+    
+    # 高牌獎勵
+    if is_hi_winner:
+        hi_wins = 1
+        pot_share += hi_pot_value / hi_count
+    
+    # 低牌獎勵
+    if is_lo_winner:
+        lo_wins = 1
+        pot_share += lo_pot_value / lo_count
+    
+    # 統計勝利類型
+    if is_hi_winner and is_lo_winner:
+        # 同時贏得高牌和低牌 - Scoop
+        scoops = 1
+    elif is_hi_winner:
+        # 只贏得高牌
+        if hi_count == 1:
+            if lo_count:
+                # 獨得高牌，有低牌玩家存在 - 獲得50%
+                splits = 1
+            else:
+                # 沒有低牌玩家，獨得整個底池
+                scoops = 1
+        elif lo_count:
+            # 有低牌玩家存在，分享高牌50% - 獲得25%或更少
+            quarters = 1
+        elif hi_count == 2:
+            # 沒有低牌玩家，與另一人平分整個底池
+            splits = 1
+        else:
+            quarters = 1
+    elif is_lo_winner:
+        # 只贏得低牌：獨得低牌50%，或與他人分享低牌50% - 獲得25%或更少
+        if lo_count == 1:
+            splits = 1
+        else:
+            quarters = 1
+    
+    # 獲得一個底池的全部且分享另一個底池時，份額大於50%且不超過75%
+    if 0.5 < pot_share <= 0.75:
+        three_quarters = 1
+    
+    return (hi_wins, lo_wins, scoops, splits, quarters, three_quarters, pot_share, pot_share * pot_share)
+
+def counters_to_results(counters, fields=COUNTER_FIELDS):
+    """將每位玩家的計數列表轉為以玩家名稱為鍵的結果字典"""
+    return {
+        f'player_{i+1}': dict(zip(fields, player_counters))
+        for i, player_counters in enumerate(counters)
+    }
+
+def merge_counters(results, other_results):
+    """將other_results的計數（包括手牌範圍的權重欄位）累加到results"""
+    for player_name, player_stats in other_results.items():
+        for field, value in player_stats.items():
+            results[player_name][field] += value
+    return results
+
+def equity_stderr(player_stats, num_trials):
+    """
+    由每局底池份額的和與平方和估計勝率（百分比）的標準誤
+    手牌範圍的加權計數為自我正規化重要性抽樣：Var ≈ Σ w²(v - μ)² / (Σ w)²
+    """
+    if 'weight' in player_stats:
+        weight = player_stats['weight']
+        mean = player_stats['total_value'] / weight
+        variance = (player_stats['value_sq_weight_sq'] - 2 * mean * player_stats['value_weight_sq']
+                    + mean * mean * player_stats['weight_sq'])
+        return sqrt(max(variance, 0.0)) / weight * 100
+    if num_trials < 2:
+        return 0.0
+    mean = player_stats['total_value'] / num_trials
+    variance = max(player_stats['total_value_sq'] / num_trials - mean * mean, 0.0)
+    return sqrt(variance / (num_trials - 1)) * 100
+
+def derive_seed_stream(rng):
+    """由rng取一個主種子，返回可依序產生各分片子種子的獨立亂數流"""
+    return random.Random(rng.getrandbits(64))
+
+def simulate_vs_random_counts(evaluator, hero_codes, board_codes, num_opponents, num_trials, rng):
+    """
+    模擬一手牌對num_opponents手隨機牌，返回主角的計數列表（順序同COUNTER_FIELDS）
+    每局以部分Fisher–Yates從同一個剩餘牌緩衝區抽出所有對手的牌（前段）與補完的公共牌（後段），
+    對手手牌與公共牌都寫入預先配置的5張緩衝區，迴圈中不建立其他牌局狀態
+    """
+    get_best_hi_lo_board = evaluator.get_best_hi_lo_board
+    dead_mask = codes_to_mask(hero_codes) | codes_to_mask(board_codes)
+    buffer = remaining_codes(dead_mask)
+    known_count = len(board_codes)
+    opponent_cards = 5 * num_opponents
+    deal_count = opponent_cards + 5 - known_count
+    full_board = list(board_codes) + [0] * (5 - known_count)
+    opponent_hands = [[0] * 5 for _ in range(num_opponents)]
+    random_func = rng.random
+    counters = [0] * NUM_COUNTER_FIELDS
+    
+    for _ in range(num_trials):
+        partial_shuffle(buffer, deal_count, random_func)
+        for i in range(known_count, 5):
+            full_board[i] = buffer[opponent_cards + i - known_count]
+        board = BoardContext(full_board)
+        hero_hi, hero_lo = get_best_hi_lo_board(hero_codes, board)
+        
+        # 主角平手時計入獲勝人數；任一對手勝過主角時主角不贏該半池
+        hero_wins_hi = hero_wins_lo = True
+        hi_count = 1
+        lo_count = 0 if hero_lo is None else 1
+        for start, opponent_hand in zip(range(0, opponent_cards, 5), opponent_hands):
+            for i in range(5):
+                opponent_hand[i] = buffer[start + i]
+            hi_strength, lo_strength = get_best_hi_lo_board(opponent_hand, board)
+            if hi_strength > hero_hi:
+                hero_wins_hi = False
+            elif hi_strength == hero_hi:
+                hi_count += 1
+            if lo_strength is not None:
+                if hero_lo is None or lo_strength < hero_lo:
+                    hero_wins_lo = False
+                    lo_count = max(lo_count, 1)
+                elif lo_strength == hero_lo:
+                    lo_count += 1
+        
+        if hero_lo is None:
+            hero_wins_lo = False
+        if hero_wins_hi or hero_wins_lo:
+            # 沒贏的半池只需區分有沒有人有低牌，人數統一記為1以共用pot_share_row的快取
+            row = pot_share_row(hi_count if hero_wins_hi else 1, lo_count if hero_wins_lo else min(lo_count, 1),
+                                hero_wins_hi, hero_wins_lo)
+            for field in range(NUM_COUNTER_FIELDS):
+                counters[field] += row[field]
+    return counters
+
+def _run_shard(backend, hands_codes, board_codes, available_codes, exact, start, stop, seed, runouts=None):
+    """
+    在子進程中執行一個分片
+    窮舉模式處理第start到stop個牌面組合（指定runouts時為該列表的這一段），
+    蒙特卡羅模式以seed獨立抽樣stop-start次
+    """
+    rng = random.Random(seed)
+    return _get_shard_calculator(backend)._simulate(hands_codes, board_codes, available_codes,
+                                                    exact, start, stop, rng, runouts=runouts)
+
+def _run_batch_group(backend, group, options):
+    """在子進程中依序計算共用同一組公共牌的一組批次工作"""
+    return _get_shard_calculator(backend)._run_batch_group(group, options)
+
+def _get_shard_calculator(backend):
+    """取得子進程內指定評估後端的計算器"""
+    calculator = _shard_calculators.get(backend)
+    if calculator is None:
+        calculator = _shard_calculators[backend] = OmahaHiLoEquityCalculator(backend)
+    return calculator
 
 class OmahaHiLoEquityCalculator:
     """奧瑪哈高低牌勝率計算器"""
     
-    def __init__(self):
-        self.deck = Deck()
-        self.hand_evaluator = HandEvaluator()
+    def __init__(self, backend=HandEvaluator.BACKEND_LOOKUP, board_cache=None):
+        # 只保存不可變的設定與查找表，每次計算的狀態都是區域變數，同一實例可安全地被多個執行緒同時使用
+        # （批次計算內部會以board_cache建立單一執行緒專用的計算器，讓同一組公共牌的工作共用牌面計算）
+        self.hand_evaluator = HandEvaluator(backend, board_cache)
     
-    def calculate_equity(self, players_hands, board_cards=None, num_simulations=10000):
+    def calculate_equity(self, players_hands, board_cards=None, num_simulations=10000,
+                         exact=None, exact_threshold=None, workers=1, seed=None, rng=None,
+                         target_stderr=None, batch_size=1000, progress=None, cancel=None, time_budget_ms=None):
         """
         計算多個玩家的勝率
         
         Args:
-            players_hands: 玩家手牌列表，每個元素是4張牌的列表
+            players_hands: 玩家手牌列表，每個元素是5張牌的列表或HandRange（加權手牌範圍，每局依權重抽一手）
             board_cards: 已知的公共牌（可以是0-5張）
-            num_simulations: 模擬次數
+            num_simulations: 模擬次數（至少為1）
+            exact: True窮舉所有剩餘牌面，False強制蒙特卡羅，None依exact_threshold自動選擇；
+                有玩家為範圍時一律蒙特卡羅
+            exact_threshold: 自動窮舉的牌面數上限，預設為num_simulations
+            workers: 大於1時將模擬分片到常駐進程池平行計算
+            seed: 亂數種子，相同種子、參數與workers得到完全相同的結果
+            rng: 自訂的random.Random實例（優先於seed），未指定時每次呼叫使用獨立的亂數流
+            target_stderr: 目標標準誤（勝率百分點，例如0.25），蒙特卡羅模式下每batch_size次檢查一次，
+                所有玩家都達標即提前停止，num_simulations為模擬次數上限
+            batch_size: 分批計算（提前停止、回報進度、可取消）時每批的模擬次數
+            progress: 可選的進度回呼 progress(已完成牌面數, 預計牌面數, 各玩家目前勝率列表)，每批完成後呼叫
+            cancel: 可選的取消標記（具有is_set()的物件，例如threading.Event），每批之間檢查，設定後停止計算
+            time_budget_ms: 可選的時間上限（毫秒），每批之間檢查，超過即停止計算
+        
+        Returns:
+            dict: 每個玩家的勝率統計，trials為實際計算的牌面數，exact表示是否為窮舉結果，
+                equity_stderr為勝率的標準誤（窮舉時為0）；
+                因取消或時間上限而中止時為目前已完成部分的估計（至少完成一批），
+                窮舉中途停止的結果為隨機順序下已完成牌面的估計（不放回抽樣），exact為False；
+                有玩家為範圍時各項次數為依抽樣權重換算的等效次數
+        """
+        deadline = None if time_budget_ms is None else time.monotonic() + time_budget_ms / 1000
+        hands_codes, board_codes, available_codes, exact, num_trials = self._prepare_deal(
+            players_hands, board_cards, num_simulations, exact, exact_threshold)
+        
+        # 每次呼叫使用專屬的亂數流，不與其他執行緒共用全域random狀態
+        if rng is None:
+            rng = random.Random(seed)
+        
+        if (progress is None and cancel is None and deadline is None
+                and (exact or target_stderr is None)):
+            results = self._run_trials(hands_codes, board_codes, available_codes,
+                                       exact, 0, num_trials, workers, rng)
+            return self._summarize(results, num_trials, exact)
+        
+        for trials_done, total_trials, results in self._iter_batches(
+                hands_codes, board_codes, available_codes, exact, num_trials,
+                workers, rng, target_stderr, batch_size, cancel, deadline):
+            if progress is not None:
+                progress(trials_done, total_trials, [stats['equity'] for stats in results.values()])
+        return results
+    
+    def iter_equity(self, players_hands, board_cards=None, num_simulations=10000,
+                    exact=None, exact_threshold=None, workers=1, seed=None, rng=None,
+                    target_stderr=None, batch_size=1000, cancel=None, time_budget_ms=None):
+        """
+        逐批計算勝率的迭代器（參數同calculate_equity），輸入在呼叫時立即驗證
+        每完成batch_size個牌面產生一次 (已完成牌面數, 預計牌面數, 目前結果)，結果格式同calculate_equity；
+        最後一次產生的結果即為最終結果，中途停止迭代（或close()）即取消剩餘計算
+        """
+        deadline = None if time_budget_ms is None else time.monotonic() + time_budget_ms / 1000
+        hands_codes, board_codes, available_codes, exact, num_trials = self._prepare_deal(
+            players_hands, board_cards, num_simulations, exact, exact_threshold)
+        if rng is None:
+            rng = random.Random(seed)
+        return self._iter_batches(hands_codes, board_codes, available_codes, exact, num_trials,
+                                  workers, rng, target_stderr, batch_size, cancel, deadline)
+    
+    def _prepare_deal(self, players_hands, board_cards, num_simulations, exact, exact_threshold):
+        """
+        驗證輸入並決定計算方式
         
         Returns:
-            dict: 每個玩家的勝率統計
+            tuple: (hands_codes, board_codes, available_codes, exact, num_trials)
         """
         if not players_hands:
             raise ValueError("至少需要一個玩家")
+        if num_simulations < 1:
+            raise ValueError("模擬次數至少為1")
         
-        # 驗證手牌
+        # 驗證手牌（HandRange為手牌範圍，每局依權重抽一手）
         for i, hand in enumerate(players_hands):
-            if len(hand) != 5:
+            if not isinstance(hand, HandRange) and len(hand) != 5:
                 raise ValueError(f"玩家 {i+1} 的手牌必須是5張")
         
         if board_cards is None:
@@ -41,144 +355,550 @@ class OmahaHiLoEquityCalculator:
         if len(board_cards) > 5:
             raise ValueError("公共牌不能超過5張")
         
-        # 重置牌堆並移除已知牌
-        self.deck.reset()
-        known_cards = []
-        for hand in players_hands:
-            known_cards.extend(hand)
-        known_cards.extend(board_cards)
-        self.deck.remove_cards(known_cards)
-        
-        # 初始化結果統計
-        results = {
-            f'player_{i+1}': {
-                'hi_wins': 0,
-                'lo_wins': 0, 
-                'scoops': 0,  # 獨贏整個底池
-                'splits': 0,  # 平分底池 (50%)
-                'quarters': 0,  # 獲得1/4底池
-                'three_quarters': 0,  # 獲得3/4底池
-                'total_value': 0  # 總價值（勝率）
-            }
-            for i in range(len(players_hands))
-        }
-        
-        # 進行蒙特卡羅模擬
-        for _ in range(num_simulations):
-            # 隨機補完公共牌到5張
-            remaining_board = 5 - len(board_cards)
-            if remaining_board > 0:
-                available_cards = self.deck.get_remaining_cards()
-                random_board = random.sample(available_cards, remaining_board)
-                full_board = board_cards + random_board
+        # 在API邊界轉換為整數編碼，模擬迴圈內不再使用Card物件
+        hands_codes = [hand if isinstance(hand, HandRange) else cards_to_ints(hand) for hand in players_hands]
+        board_codes = cards_to_ints(board_cards)
+        
+        # 已知牌的遮罩只存在於這次呼叫中，計算器本身不保存任何牌局狀態，可由多個執行緒共用
+        known_codes = [code for hand in hands_codes if not isinstance(hand, HandRange) for code in hand] + board_codes
+        dead_mask = codes_to_mask(known_codes)
+        if bin(dead_mask).count('1') != len(known_codes):
+            raise ValueError("手牌與公共牌中有重複的牌")
+        
+        # 範圍先排除與公共牌、確定手牌衝突的組合；有範圍時每局的手牌不同，只能蒙特卡羅模擬
+        if any(isinstance(hand, HandRange) for hand in hands_codes):
+            for i, hand in enumerate(hands_codes):
+                if isinstance(hand, HandRange):
+                    hands_codes[i] = hand = hand.restrict(dead_mask)
+                    if hand.is_empty():
+                        raise ValueError(f"玩家 {i+1} 的範圍中沒有與已知牌不衝突的組合")
+            return hands_codes, board_codes, remaining_codes(dead_mask), False, num_simulations
+        
+        # 補完公共牌到5張：可能的牌面數量不超過門檻時窮舉所有牌面，否則蒙特卡羅模擬
+        remaining_board = 5 - len(board_codes)
+        available_codes = remaining_codes(dead_mask)
+        space_size = comb(len(available_codes), remaining_board)
+        if exact is None:
+            threshold = num_simulations if exact_threshold is None else exact_threshold
+            exact = space_size <= threshold
+        num_trials = space_size if exact else num_simulations
+        return hands_codes, board_codes, available_codes, exact, num_trials
+    
+    def _iter_batches(self, hands_codes, board_codes, available_codes, exact, total_trials,
+                      workers, rng, target_stderr, batch_size, cancel=None, deadline=None):
+        """
+        分批計算，每批後產生 (已完成牌面數, 預計牌面數, 目前結果)
+        蒙特卡羅且指定target_stderr時，每位玩家的標準誤都達標即提前停止；
+        cancel被設定或超過deadline（time.monotonic()時間）時也在該批之後停止
+        窮舉模式隨時可能中途停止（包括呼叫者不再迭代），因此以rng打亂牌面順序，
+        已完成的部分是全部牌面的不放回隨機抽樣；牌面數超過MAX_SHUFFLED_RUNOUTS時改為蒙特卡羅
+        """
+        runouts = None
+        if exact:
+            if total_trials <= MAX_SHUFFLED_RUNOUTS:
+                runouts = list(combinations(available_codes, 5 - len(board_codes)))
+                rng.shuffle(runouts)
             else:
-                full_board = board_cards
-            
-            # 評估每個玩家的最佳高牌和低牌
-            player_results = []
-            for i, hand in enumerate(players_hands):
-                hi_hand, hi_strength = self.hand_evaluator.get_best_high_hand(hand, full_board)
-                lo_hand, lo_strength = self.hand_evaluator.get_best_low_hand(hand, full_board)
-                
-                player_results.append({
-                    'player': f'player_{i+1}',
-                    'hi_strength': hi_strength,
-                    'lo_strength': lo_strength,
-                    'has_low': lo_strength is not None
-                })
+                exact = False
+        
+        # 各批共用同一個抽牌緩衝區，單進程時與一次跑完的結果相同
+        buffer = list(available_codes)
+        results = None
+        num_trials = 0
+        while num_trials < total_trials:
+            batch = min(batch_size, total_trials - num_trials)
+            batch_results = self._run_trials(hands_codes, board_codes, available_codes, exact,
+                                             num_trials, num_trials + batch, workers, rng, buffer, runouts)
+            results = batch_results if results is None else merge_counters(results, batch_results)
+            num_trials += batch
+            # 手牌範圍還沒有抽到任何互不衝突的牌局時沒有可回報的估計，直接計算下一批
+            if results['player_1'].get('weight', 1) == 0 and num_trials < total_trials:
+                continue
+            # 窮舉中途停止時只涵蓋部分牌面，不再視為精確結果，標準誤依不放回抽樣修正
+            if exact and num_trials < total_trials:
+                yield num_trials, total_trials, self._summarize(results, num_trials, False, total_trials)
+            else:
+                yield num_trials, total_trials, self._summarize(results, num_trials, exact)
+            if (not exact and target_stderr is not None
+                    and max(equity_stderr(stats, num_trials) for stats in results.values()) <= target_stderr):
+                break
+            if cancel is not None and cancel.is_set():
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+    
+    @staticmethod
+    def _summarize(results, num_trials, exact, population=None):
+        """
+        計數結果 -> 含各項比率的結果字典（不修改傳入的計數）
+        population為不放回抽樣的母體大小（窮舉中途停止時），用於修正標準誤
+        """
+        summary = {}
+        for player_name, counters in results.items():
+            player_stats = dict(counters)
+            stderr = None
+            if 'weight' in player_stats:
+                # 手牌範圍的加權計數換算為num_trials局的等效次數，標準誤在換算前依權重估計
+                if not player_stats['weight']:
+                    raise ValueError("手牌範圍之間沒有互不衝突的組合")
+                stderr = equity_stderr(player_stats, num_trials)
+                scale = num_trials / player_stats['weight']
+                for field in COUNTER_FIELDS[:-2]:
+                    player_stats[field] = round(player_stats[field] * scale)
+                for field in COUNTER_FIELDS[-2:]:
+                    player_stats[field] *= scale
+                for field in RANGE_WEIGHT_FIELDS:
+                    del player_stats[field]
+            player_stats['hi_win_rate'] = player_stats['hi_wins'] / num_trials * 100
+            player_stats['lo_win_rate'] = player_stats['lo_wins'] / num_trials * 100
+            player_stats['scoop_rate'] = player_stats['scoops'] / num_trials * 100
+            player_stats['split_rate'] = player_stats['splits'] / num_trials * 100
+            player_stats['quarter_rate'] = player_stats['quarters'] / num_trials * 100
+            player_stats['three_quarter_rate'] = player_stats['three_quarters'] / num_trials * 100
+            player_stats['equity'] = player_stats['total_value'] / num_trials * 100
+            player_stats['trials'] = num_trials  # 實際模擬（或窮舉）的牌面數
+            player_stats['exact'] = exact
+            if exact:
+                player_stats['equity_stderr'] = 0.0
+            else:
+                player_stats['equity_stderr'] = equity_stderr(player_stats, num_trials) if stderr is None else stderr
+            if population is not None:
+                player_stats['equity_stderr'] *= sqrt((population - num_trials) / (population - 1))
+            del player_stats['total_value_sq']
+            summary[player_name] = player_stats
+        return summary
+    
+    def _run_trials(self, hands_codes, board_codes, available_codes, exact, start, stop, workers, rng,
+                    buffer=None, runouts=None):
+        """執行第start到stop個模擬，workers大於1時分片到進程池"""
+        if workers > 1 and stop - start > 1:
+            return self._simulate_sharded(hands_codes, board_codes, available_codes,
+                                          exact, start, stop, workers, rng, runouts)
+        return self._simulate(hands_codes, board_codes, available_codes, exact, start, stop, rng, buffer, runouts)
+    
+    def _simulate(self, hands_codes, board_codes, available_codes, exact, start, stop, rng, buffer=None,
+                  runouts=None):
+        """
+        執行第start到stop個牌面（窮舉）或stop-start次隨機抽樣（蒙特卡羅），返回計數結果
+        buffer為可選的抽牌緩衝區（剩餘牌的排列），分批呼叫時傳入同一個緩衝區，
+        結果與一次跑完完全相同；runouts為可選的窮舉牌面列表（預設依combinations順序）
+        """
+        if any(isinstance(hand, HandRange) for hand in hands_codes):
+            return self._simulate_ranges(hands_codes, board_codes, available_codes, stop - start, rng)
+        
+        # 初始化結果統計：每位玩家一列固定寬度的計數，欄位順序同COUNTER_FIELDS
+        counters = [[0] * NUM_COUNTER_FIELDS for _ in hands_codes]
+        
+        known_count = len(board_codes)
+        remaining_board = 5 - known_count
+        # 手牌組合編碼與已知公共牌的評估只做一次，每個牌面只評估包含新牌的組合
+        known_state = self.hand_evaluator.start_board(hands_codes, board_codes)
+        if exact:
+            # 依字典序列舉時相鄰牌面常有相同前綴（例如同一張轉牌），前綴相同的狀態直接沿用
+            if runouts is None:
+                runouts = islice(combinations(available_codes, remaining_board), start, stop)
+            else:
+                # 打亂順序的牌面在這一段內重新排序，讓相同前綴的牌面相鄰；計數與評估順序無關
+                runouts = sorted(runouts[start:stop])
+            states = [known_state] + [None] * remaining_board
+            previous = None
+            for runout in runouts:
+                i = 0
+                if previous is not None:
+                    while runout[i] == previous[i]:
+                        i += 1
+                for j in range(i, remaining_board):
+                    states[j + 1] = states[j].add_card(runout[j])
+                previous = runout
+                self._settle_strengths(states[-1].strengths(), counters)
+            return counters_to_results(counters)
+        
+        # 剩餘牌陣列與5張公共牌緩衝區每次呼叫只建立一次，每局以部分Fisher–Yates原地抽牌
+        if buffer is None:
+            buffer = list(available_codes)
+        random_func = rng.random
+        if remaining_board == 1:
+            # 只差河牌時沿用轉牌的狀態，每局只評估包含河牌的組合
+            for _ in range(stop - start):
+                partial_shuffle(buffer, 1, random_func)
+                self._settle_strengths(known_state.add_card(buffer[0]).strengths(), counters)
+            return counters_to_results(counters)
+        
+        # 隨機牌面之間沒有共同前綴可沿用，逐張加入反而多出建立狀態的成本，直接評估整個牌面
+        full_board = board_codes + [0] * remaining_board
+        for _ in range(stop - start):
+            partial_shuffle(buffer, remaining_board, random_func)
+            for i in range(remaining_board):
+                full_board[known_count + i] = buffer[i]
+            self._settle_board(hands_codes, full_board, counters)
+        
+        return counters_to_results(counters)
+    
+    def _simulate_ranges(self, players, board_codes, available_codes, count, rng):
+        """
+        有玩家為手牌範圍時的蒙特卡羅模擬（序列重要性抽樣），返回count局的加權計數結果
+        每局由deal_ranges依序替各範圍從不衝突的組合中抽樣並給出該局的權重，再從剩餘牌補完公共牌；
+        計數欄位為權重加權的和，另加RANGE_WEIGHT_FIELDS供_summarize正規化與估計標準誤
+        只要存在互不衝突的組合，每局都有機會抽到；某個範圍已無可用組合的局權重為0，仍計入count
+        """
+        counters = [[0] * (NUM_COUNTER_FIELDS + len(RANGE_WEIGHT_FIELDS)) for _ in players]
+        # 組合較少的範圍先抽，較不容易抽到後面的範圍已無組合可用的牌局；隨機範圍最後抽
+        range_players = sorted((i for i, hand in enumerate(players) if isinstance(hand, HandRange)),
+                               key=lambda i: (players[i].is_random, len(players[i])))
+        ranges = [players[i] for i in range_players]
+        hands_codes = [None if isinstance(hand, HandRange) else hand for hand in players]
+        value_field = COUNTER_FIELDS.index('total_value')
+        
+        known_count = len(board_codes)
+        remaining_board = 5 - known_count
+        full_board = board_codes + [0] * remaining_board
+        random_func = rng.random
+        for _ in range(count):
+            masks, deal_weight = deal_ranges(ranges, random_func)
+            if masks is None:
+                continue
             
-            # 找出高牌獲勝者
-            max_hi_strength = max(p['hi_strength'] for p in player_results)
-            hi_winners = [p for p in player_results if p['hi_strength'] == max_hi_strength]
+            dealt_mask = 0
+            for i, mask in zip(range_players, masks):
+                dealt_mask |= mask
+                hands_codes[i] = mask_to_codes(mask)
+            buffer = [code for code in available_codes if not dealt_mask >> code & 1]
+            partial_shuffle(buffer, remaining_board, random_func)
+            for i in range(remaining_board):
+                full_board[known_count + i] = buffer[i]
+            trial_counters = [[0] * NUM_COUNTER_FIELDS for _ in players]
+            self._settle_board(hands_codes, full_board, trial_counters)
             
-            # 找出低牌獲勝者（如果有人符合低牌條件）
-            lo_players = [p for p in player_results if p['has_low']]
-            lo_winners = []
-            if lo_players:
-                min_lo_strength = min(p['lo_strength'] for p in lo_players)
-                lo_winners = [p for p in lo_players if p['lo_strength'] == min_lo_strength]
+            weight_sq = deal_weight * deal_weight
+            for player_counters, trial in zip(counters, trial_counters):
+                for field in range(NUM_COUNTER_FIELDS):
+                    player_counters[field] += deal_weight * trial[field]
+                value = trial[value_field]
+                player_counters[NUM_COUNTER_FIELDS] += deal_weight
+                player_counters[NUM_COUNTER_FIELDS + 1] += weight_sq
+                player_counters[NUM_COUNTER_FIELDS + 2] += weight_sq * value
+                player_counters[NUM_COUNTER_FIELDS + 3] += weight_sq * value * value
+        
+        return counters_to_results(counters, COUNTER_FIELDS + RANGE_WEIGHT_FIELDS)
+    
+    def _simulate_sharded(self, hands_codes, board_codes, available_codes, exact, start, stop, workers, rng,
+                          runouts=None):
+        """
+        將第start到stop個模擬平均分成workers個分片交給進程池，合併各分片的計數
+        每個分片的亂數種子由rng產生的主種子依序導出，同一rng狀態與workers下結果可重現
+        指定runouts時每個分片只傳送自己那一段牌面
+        """
+        seed_stream = derive_seed_stream(rng)
+        shard_size, extra = divmod(stop - start, workers)
+        
+        results = None
+        with process_pool(workers) as pool:
+            futures = []
+            for shard in range(workers):
+                shard_stop = start + shard_size + (1 if shard < extra else 0)
+                seed = seed_stream.getrandbits(64)
+                if shard_stop > start and runouts is not None:
+                    futures.append(pool.submit(_run_shard, self.hand_evaluator.backend, hands_codes, board_codes,
+                                               available_codes, exact, 0, shard_stop - start, seed,
+                                               runouts[start:shard_stop]))
+                elif shard_stop > start:
+                    futures.append(pool.submit(_run_shard, self.hand_evaluator.backend, hands_codes,
+                                               board_codes, available_codes, exact, start, shard_stop, seed))
+                start = shard_stop
             
-            # 分配獎勵和統計勝利類型
-            hi_pot_value = 0.5 if lo_winners else 1.0  # 如果沒有低牌，高牌得整個底池
-            lo_pot_value = 0.5 if lo_winners else 0.0   # 只有在有低牌時才有低牌底池
+            for future in futures:
+                shard_results = future.result()
+                results = shard_results if results is None else merge_counters(results, shard_results)
+        return results
+    
+    def _settle_board(self, hands_codes, full_board, counters):
+        """
+        評估一個完整的5張公共牌面並將底池分配累加到counters
+        牌面的組合與同花、低牌判斷只算一次，所有玩家共用
+        """
+        get_best_hi_lo_board = self.hand_evaluator.get_best_hi_lo_board
+        board = BoardContext(full_board)
+        self._settle_strengths([get_best_hi_lo_board(hand, board) for hand in hands_codes], counters)
+    
+    @staticmethod
+    def _settle_strengths(strengths, counters):
+        """
+        依每位玩家的 (hi_strength, lo_strength) 將底池分配累加到counters
+        counters[i]為第i位玩家依COUNTER_FIELDS排列的計數列表；獲勝者以位元遮罩記錄，
+        每位獲勝者的各項增量直接查pot_share_row表
+        """
+        # 評估每個玩家的最佳高牌和低牌，同時找出高牌與低牌獲勝者
+        best_hi = -1
+        hi_mask = hi_count = 0
+        best_lo = None
+        lo_mask = lo_count = 0
+        for i, (hi_strength, lo_strength) in enumerate(strengths):
+            if hi_strength > best_hi:
+                best_hi = hi_strength
+                hi_mask = 1 << i
+                hi_count = 1
+            elif hi_strength == best_hi:
+                hi_mask |= 1 << i
+                hi_count += 1
             
-            # 計算每個玩家在這一手的收益
-            for player_result in player_results:
-                player_name = player_result['player']
-                is_hi_winner = player_result in hi_winners
-                is_lo_winner = player_result in lo_winners
-                pot_share = 0
-                
-                # 高牌獎勵
-                if is_hi_winner:
-                    results[player_name]['hi_wins'] += 1
-                    hi_share = hi_pot_value / len(hi_winners)
-                    pot_share += hi_share
-                
-                # 低牌獎勵
-                if is_lo_winner:
-                    results[player_name]['lo_wins'] += 1
-                    lo_share = lo_pot_value / len(lo_winners)
-                    pot_share += lo_share
-                
-                results[player_name]['total_value'] += pot_share
-                
-                # 統計勝利類型
-                if is_hi_winner and is_lo_winner:
-                    # 同時贏得高牌和低牌 - Scoop
-                    results[player_name]['scoops'] += 1
-                        
-                elif is_hi_winner and not is_lo_winner:
-                    # 只贏得高牌
-                    if len(hi_winners) == 1:
-                        if lo_winners:
-                            # 獨得高牌，有低牌玩家存在 - 獲得50%
-                            results[player_name]['splits'] += 1
-                        else:
-                            # 沒有低牌玩家，獨得整個底池
-                            results[player_name]['scoops'] += 1
-                    else:
-                        # 與他人分享高牌
-                        if lo_winners:
-                            # 有低牌玩家存在，分享高牌50% - 獲得25%或更少
-                            results[player_name]['quarters'] += 1
+            if lo_strength is not None:
+                if best_lo is None or lo_strength < best_lo:
+                    best_lo = lo_strength
+                    lo_mask = 1 << i
+                    lo_count = 1
+                elif lo_strength == best_lo:
+                    lo_mask |= 1 << i
+                    lo_count += 1
+        
+        # 只有獲勝者需要累加
+        winners = hi_mask | lo_mask
+        i = 0
+        while winners:
+            if winners & 1:
+                row = pot_share_row(hi_count, lo_count, hi_mask >> i & 1, lo_mask >> i & 1)
+                player_counters = counters[i]
+                for field in range(NUM_COUNTER_FIELDS):
+                    player_counters[field] += row[field]
+            winners >>= 1
+            i += 1
+    
+    def calculate_equity_batch(self, jobs, workers=1, seed=None, **options):
+        """
+        批次計算多組對局的勝率
+        
+        Args:
+            jobs: 工作列表，每個元素為 (players_hands, board_cards, num_simulations) 或再加上該工作的亂數種子
+            workers: 大於1時將各組工作分散到常駐進程池
+            seed: 批次亂數種子，未個別指定種子的工作依序由此導出，結果與分組方式及workers無關
+            options: 其餘傳給calculate_equity的參數（exact、exact_threshold、target_stderr、batch_size）
+        
+        Returns:
+            list: 依輸入順序的結果，格式同calculate_equity；無效的工作在其位置為 {'error': 訊息}
+        """
+        return list(self.iter_equity_batch(jobs, workers, seed, **options))
+    
+    def iter_equity_batch(self, jobs, workers=1, seed=None, **options):
+        """
+        批次計算的迭代器（參數同calculate_equity_batch），依輸入順序逐一產生結果
+        所有工作在呼叫時立即驗證，無效的工作只在自己的位置產生 {'error': 訊息}；
+        公共牌相同的工作分為一組，共用公共牌的計算並在同一個工作進程中依序計算，
+        workers大於1時過大的組再切成數段，讓所有工作進程都分到工作
+        """
+        seed_stream = random.Random(seed)
+        groups = {}
+        errors = {}
+        for index, job in enumerate(jobs):
+            players_hands, board_cards, num_simulations = job[:3]
+            job_seed = job[3] if len(job) > 3 else None
+            # 無論是否個別指定種子都從亂數流取一個值，讓其他工作的種子不受影響
+            derived_seed = seed_stream.getrandbits(64)
+            try:
+                self._prepare_deal(players_hands, board_cards, num_simulations, None, None)
+            except ValueError as e:
+                errors[index] = {'error': str(e)}
+                continue
+            # 依原始順序的公共牌分組，同一組的牌面快取鍵才會相同
+            board_key = tuple(cards_to_ints(board_cards or []))
+            groups.setdefault(board_key, []).append(
+                (index, players_hands, board_cards, num_simulations,
+                 derived_seed if job_seed is None else job_seed))
+        
+        groups = list(groups.values())
+        if workers > 1:
+            chunk_size = max(1, -(-(len(jobs) - len(errors)) // workers))
+            groups = [group[start:start + chunk_size] for group in groups
+                      for start in range(0, len(group), chunk_size)]
+        return self._iter_batch_results(groups, errors, len(jobs), workers, options)
+    
+    def _iter_batch_results(self, groups, errors, num_jobs, workers, options):
+        """依輸入順序產生各工作結果；單進程時在需要某個工作時才計算它所在的整組"""
+        group_of = {job[0]: group_id for group_id, group in enumerate(groups) for job in group}
+        finished = errors
+        with process_pool(workers) if workers > 1 else nullcontext() as pool:
+            futures = []
+            if pool is not None:
+                futures = [pool.submit(_run_batch_group, self.hand_evaluator.backend, group, options)
+                           for group in groups]
+            try:
+                for index in range(num_jobs):
+                    if index not in finished:
+                        group_id = group_of[index]
+                        if pool is not None:
+                            group_results = futures[group_id].result()
                         else:
-                            # 沒有低牌玩家，與他人分享整個底池
-                            if len(hi_winners) == 2:
-                                results[player_name]['splits'] += 1
-                            else:
-                                results[player_name]['quarters'] += 1
-                            
-                elif is_lo_winner and not is_hi_winner:
-                    # 只贏得低牌
-                    if len(lo_winners) == 1:
-                        # 獨得低牌50%
-                        results[player_name]['splits'] += 1
-                    else:
-                        # 與他人分享低牌50% - 獲得25%或更少
-                        results[player_name]['quarters'] += 1
-                        
-                # 檢查是否獲得3/4底池的情況
-                # 當一個玩家獲得其中一個底池的全部，而另一個底池被多人分享時
-                if pot_share == 0.75:
-                    results[player_name]['three_quarters'] += 1
-                elif pot_share > 0.5 and pot_share < 0.75:
-                    # 例如獨得一個底池，但與另一人分享另一個底池 (0.5 + 0.25 = 0.75)
-                    # 或者其他大於50%但小於75%的情況
-                    results[player_name]['three_quarters'] += 1
-        
-        # 計算百分比
-        for player_name in results:
-            player_stats = results[player_name]
-            player_stats['hi_win_rate'] = player_stats['hi_wins'] / num_simulations * 100
-            player_stats['lo_win_rate'] = player_stats['lo_wins'] / num_simulations * 100
-            player_stats['scoop_rate'] = player_stats['scoops'] / num_simulations * 100
-            player_stats['split_rate'] = player_stats['splits'] / num_simulations * 100
-            player_stats['quarter_rate'] = player_stats['quarters'] / num_simulations * 100
-            player_stats['three_quarter_rate'] = player_stats['three_quarters'] / num_simulations * 100
-            player_stats['equity'] = player_stats['total_value'] / num_simulations * 100
+                            group_results = self._run_batch_group(groups[group_id], options)
+                        finished.update(group_results)
+                    yield finished.pop(index)
+            finally:
+                for future in futures:
+                    future.cancel()
+    
+    def _run_batch_group(self, group, options):
+        """
+        依序計算一組公共牌相同的工作，返回 [(index, results), ...]
+        整組使用一個帶牌面快取的計算器，加入轉牌、河牌時只與公共牌有關的計算各做一次；
+        計算中發生的錯誤只記錄在該工作的位置
+        """
+        calculator = OmahaHiLoEquityCalculator(self.hand_evaluator.backend, board_cache={})
+        group_results = []
+        for index, players_hands, board_cards, num_simulations, job_seed in group:
+            try:
+                results = calculator.calculate_equity(players_hands, board_cards, num_simulations,
+                                                      seed=job_seed, **options)
+            except ValueError as e:
+                results = {'error': str(e)}
+            group_results.append((index, results))
+        return group_results
+    
+    def preflop_equity_vs_random(self, hand_cards, num_simulations=10000, table_path=None, seed=None):
+        """
+        翻牌前單挑一手隨機牌的勝率
+        優先查詢preflop_table.py預先計算的勝率表，表不存在或尚未計算此手牌時才即時模擬
+        （表中只有勝率，需要完整統計的calculate_equity與calculate_equity_vs_random不查此表）
         
-        return results
+        Returns:
+            dict: equity（百分比）、trials（模擬次數）、precomputed（是否來自勝率表）
+        """
+        from preflop_table import DEFAULT_TABLE_PATH, load_preflop_table, simulate_vs_random
+        
+        if len(hand_cards) != 5:
+            raise ValueError("手牌必須是5張")
+        hand_codes = cards_to_ints(hand_cards)
+        
+        table = load_preflop_table(table_path or DEFAULT_TABLE_PATH)
+        entry = table.lookup(hand_codes) if table else None
+        if entry is not None:
+            return {'equity': entry[0], 'trials': entry[1], 'precomputed': True}
+        
+        equity = simulate_vs_random(hand_codes, num_simulations, random.Random(seed), self.hand_evaluator)
+        return {'equity': equity, 'trials': num_simulations, 'precomputed': False}
+    
+    def calculate_equity_vs_random(self, hero_hand, board_cards=None, num_opponents=1,
+                                   num_simulations=10000, seed=None, rng=None):
+        """
+        計算一手牌對num_opponents手未知（隨機）手牌的勝率
+        對手的牌在每局模擬中直接從剩餘牌抽出，不需列舉或傳入對手手牌
+        
+        Args:
+            hero_hand: 5張手牌
+            board_cards: 已知的公共牌（可以是0-5張）
+            num_opponents: 對手人數
+            num_simulations: 模擬次數
+            seed: 亂數種子
+            rng: 自訂的random.Random實例（優先於seed）
+        
+        Returns:
+            dict: 主角的勝率統計，格式同calculate_equity中每位玩家的結果，另加num_opponents
+        """
+        if len(hero_hand) != 5:
+            raise ValueError("手牌必須是5張")
+        if board_cards is None:
+            board_cards = []
+        if len(board_cards) > 5:
+            raise ValueError("公共牌不能超過5張")
+        if num_opponents < 1:
+            raise ValueError("至少需要一個對手")
+        if num_simulations < 1:
+            raise ValueError("模擬次數至少為1")
+        
+        hero_codes = cards_to_ints(hero_hand)
+        board_codes = cards_to_ints(board_cards)
+        known_codes = hero_codes + board_codes
+        if bin(codes_to_mask(known_codes)).count('1') != len(known_codes):
+            raise ValueError("手牌與公共牌中有重複的牌")
+        if 5 * num_opponents + 5 - len(board_codes) > 52 - len(known_codes):
+            raise ValueError(f"剩餘的牌不足以發給 {num_opponents} 個對手")
+        
+        if rng is None:
+            rng = random.Random(seed)
+        counters = simulate_vs_random_counts(self.hand_evaluator, hero_codes, board_codes,
+                                             num_opponents, num_simulations, rng)
+        results = self._summarize(counters_to_results([counters]), num_simulations, False)
+        hero_stats = results['player_1']
+        hero_stats['num_opponents'] = num_opponents
+        return hero_stats
+    
+    def calculate_equity_trajectory(self, players_hands, board_cards=None, num_simulations=10000,
+                                    exact=None, exact_threshold=None, seed=None, rng=None):
+        """
+        計算逐街勝率：翻牌前，以及公共牌已知的翻牌、轉牌、河牌各一組結果
+        需要模擬的各街共用同一個抽牌迴圈：每局洗一次剩餘牌（包含已知的公共牌），
+        每一街依序取出不屬於該街已知公共牌的牌補完牌面，各街都是正確的均勻抽樣，
+        而且同一局的各街使用相同的隨機牌，街與街之間的勝率變化雜訊較小；
+        各街已知公共牌的評估只做一次，所有局共用
+        
+        Args:
+            players_hands: 玩家手牌列表，每個元素是5張牌的列表（不支援手牌範圍）
+            board_cards: 已知的公共牌（可以是0-5張），決定要計算到哪一街
+            num_simulations: 每一街的模擬次數
+            exact: 同calculate_equity，各街依剩餘牌面數分別決定
+            exact_threshold: 同calculate_equity
+            seed: 亂數種子
+            rng: 自訂的random.Random實例（優先於seed）
+        
+        Returns:
+            list: 每一街一個字典 {'street': 街名, 'board': 該街的公共牌, 'results': 格式同calculate_equity}
+        """
+        if any(isinstance(hand, HandRange) for hand in players_hands):
+            raise ValueError("逐街勝率不支援手牌範圍")
+        if board_cards is None:
+            board_cards = []
+        hands_codes, board_codes, _, _, _ = self._prepare_deal(
+            players_hands, board_cards, num_simulations, exact, exact_threshold)
+        if rng is None:
+            rng = random.Random(seed)
+        
+        hands_mask = codes_to_mask([code for hand in hands_codes for code in hand])
+        threshold = num_simulations if exact_threshold is None else exact_threshold
+        trajectory = []
+        sampled_streets = []
+        for street, known_count in STREETS:
+            if known_count > len(board_codes):
+                break
+            known_codes = board_codes[:known_count]
+            available_codes = remaining_codes(hands_mask | codes_to_mask(known_codes))
+            space_size = comb(len(available_codes), 5 - known_count)
+            # 公共牌已完整的一街只有一種牌面，一律直接評估
+            street_exact = known_count == 5 or (space_size <= threshold if exact is None else exact)
+            entry = {'street': street, 'board': ints_to_cards(known_codes), 'results': None}
+            trajectory.append(entry)
+            if street_exact:
+                results = self._simulate(hands_codes, known_codes, available_codes, True, 0, space_size, rng)
+                entry['results'] = self._summarize(results, space_size, True)
+            else:
+                sampled_streets.append((entry, known_codes))
+        
+        if sampled_streets:
+            street_counters = self._simulate_streets(hands_codes, hands_mask,
+                                                     [known_codes for _, known_codes in sampled_streets],
+                                                     num_simulations, rng)
+            for (entry, _), counters in zip(sampled_streets, street_counters):
+                entry['results'] = self._summarize(counters_to_results(counters), num_simulations, False)
+        return trajectory
+    
+    def _simulate_streets(self, hands_codes, hands_mask, streets_known_codes, num_trials, rng):
+        """
+        以同一個抽牌迴圈模擬多街（streets_known_codes為各街的已知公共牌），返回每一街的計數列表
+        每局洗出5張牌即足夠：某街已知k張公共牌時，前5張中最多k張被略過，剩下的至少5-k張
+        """
+        buffer = remaining_codes(hands_mask)
+        plans = []
+        for known_codes in streets_known_codes:
+            state = self.hand_evaluator.start_board(hands_codes, known_codes)
+            plans.append((known_codes, codes_to_mask(known_codes), 5 - len(known_codes), state,
+                          [[0] * NUM_COUNTER_FIELDS for _ in hands_codes]))
+        
+        random_func = rng.random
+        for _ in range(num_trials):
+            partial_shuffle(buffer, 5, random_func)
+            for known_codes, known_mask, missing, state, counters in plans:
+                drawn = [code for code in buffer[:5] if not known_mask >> code & 1][:missing]
+                if missing == 1:
+                    # 只差河牌時沿用轉牌的狀態
+                    self._settle_strengths(state.add_card(drawn[0]).strengths(), counters)
+                else:
+                    self._settle_board(hands_codes, known_codes + drawn, counters)
+        return [counters for _, _, _, _, counters in plans]
     
     def calculate_hand_vs_hand(self, hand1_str, hand2_str, board_str="", num_simulations=10000):
         """
@@ -206,9 +926,9 @@ class OmahaHiLoEquityCalculator:
             return {
                 'player1': results['player_1'],
                 'player2': results['player_2'],
-                'simulations': num_simulations
+                'simulations': results['player_1']['trials']
             }
-            
+        
         except Exception as e:
             return {'error': str(e)}
     
@@ -233,8 +953,7 @@ class OmahaHiLoEquityCalculator:
                 raise ValueError("分析時公共牌必須是5張")
             
             # 獲取最佳高牌和低牌
-            hi_hand, hi_strength = self.hand_evaluator.get_best_high_hand(hand, board)
-            lo_hand, lo_strength = self.hand_evaluator.get_best_low_hand(hand, board)
+            hi_hand, hi_strength, lo_hand, lo_strength = self.hand_evaluator.get_best_hi_lo(hand, board)
             
             result = {
                 'hand_cards': [str(card) for card in hand],
@@ -250,6 +969,6 @@ class OmahaHiLoEquityCalculator:
                 result['lo_strength'] = lo_strength
             
             return result
-            
+        
         except Exception as e:
-            return {'error': str(e)}
\ No newline at end of file
+            return {'error': str(e)}
@@ -0,0 +1,122 @@
+"""
+勝率計算背景工作
+提交後立即返回工作編號，由執行緒池在背景計算，期間可查詢進度與目前的勝率
+同時執行的工作數與排隊中的工作數都有上限，避免瞬間大量請求耗盡主機資源
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+class QueueFullError(RuntimeError):
+    """排隊中的工作數已達上限"""
+
+class EquityJob:
+    """一個勝率計算工作的狀態與結果"""
+    
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    
+    def __init__(self, players_hands, board_cards):
+        self.job_id = uuid.uuid4().hex
+        self.players_hands = players_hands
+        self.board_cards = board_cards
+        self.status = self.PENDING
+        self.trials_done = 0
+        self.total_trials = None
+        self.partial_equities = None
+        self.result = None
+        self.error = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+    
+    def update_progress(self, trials_done, total_trials, equities):
+        """calculate_equity的進度回呼"""
+        self.trials_done = trials_done
+        self.total_trials = total_trials
+        self.partial_equities = equities
+
+class EquityJobManager:
+    """以執行緒池在背景執行calculate_equity的工作管理器"""
+    
+    def __init__(self, calculator, max_workers=2, max_queue=32, keep_seconds=600):
+        """
+        Args:
+            calculator: 提供calculate_equity的計算器（可為CachedEquityCalculator）
+            max_workers: 同時執行的工作數上限
+            max_queue: 等待執行的工作數上限，超過時submit拋出QueueFullError
+            keep_seconds: 完成的工作保留多久供查詢（秒）
+        """
+        self.calculator = calculator
+        self.max_queue = max_queue
+        self.keep_seconds = keep_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='equity-job')
+        self._jobs = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+    
+    def submit(self, players_hands, board_cards, num_simulations, **kwargs):
+        """
+        提交一個工作（參數同calculate_equity），立即返回EquityJob
+        
+        Raises:
+            QueueFullError: 等待執行的工作數已達上限
+        """
+        job = EquityJob(players_hands, board_cards)
+        with self._lock:
+            self._purge()
+            if self._pending >= self.max_queue:
+                raise QueueFullError(f"等待中的計算已達上限（{self.max_queue}），請稍後再試")
+            self._pending += 1
+            self._jobs[job.job_id] = job
+        self._executor.submit(self._run, job, num_simulations, kwargs)
+        return job
+    
+    def get(self, job_id):
+        """依編號取得工作，不存在或已過期時返回None"""
+        with self._lock:
+            return self._jobs.get(job_id)
+    
+    def cancel(self, job_id):
+        """
+        取消工作：排隊中的不再執行，執行中的在目前這批模擬完成後停止並保留已完成部分的結果
+        返回工作，不存在時返回None
+        """
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel_event.set()
+        return job
+    
+    def _run(self, job, num_simulations, kwargs):
+        """在工作執行緒中執行計算"""
+        with self._lock:
+            self._pending -= 1
+        if job.cancel_event.is_set():
+            job.status = EquityJob.CANCELLED
+            job.finished_at = time.time()
+            return
+        
+        job.status = EquityJob.RUNNING
+        try:
+            job.result = self.calculator.calculate_equity(job.players_hands, job.board_cards, num_simulations,
+                                                          progress=job.update_progress,
+                                                          cancel=job.cancel_event, **kwargs)
+            first_stats = next(iter(job.result.values()))
+            job.trials_done = first_stats['trials']
+            job.status = EquityJob.CANCELLED if job.cancel_event.is_set() else EquityJob.DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = EquityJob.FAILED
+        job.finished_at = time.time()
+    
+    def _purge(self):
+        """移除已完成超過keep_seconds的工作（呼叫者需持有鎖）"""
+        expire_before = time.time() - self.keep_seconds
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < expire_before]
+        for job_id in expired:
+            del self._jobs[job_id]
@@ -2,9 +2,258 @@
 奧瑪哈高低牌牌型評估器
 """
 
-from itertools import combinations
+from itertools import combinations, combinations_with_replacement
 from collections import Counter
-from card import Card
+from card import Card, cards_to_ints, ints_to_cards
+from table_store import load_table
+
+# 每個牌面對應一個質數（2=2, 3=3, ..., A=41），5張牌的乘積唯一決定牌面組合
+RANK_PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+# 依整數編碼（0-51）預先展開的花色位元
+CODE_SUIT_BITS = tuple(1 << (code & 3) for code in range(52))
+
+# 低牌位元遮罩：A=bit0, 2=bit1, ..., 8=bit7，9以上為0
+CODE_LOW_BITS = tuple(
+    1 if code >> 2 == 12 else (1 << ((code >> 2) + 1) if code >> 2 <= 6 else 0)
+    for code in range(52)
+)
+
+def _low_rank_value(mask):
+    """5個位元的遮罩 -> 原始低牌值（由大到小的百進位多項式），其他返回None"""
+    low_values = [bit + 1 for bit in range(7, -1, -1) if mask >> bit & 1]
+    if len(low_values) != 5:
+        return None
+    low_value = 0
+    for i, val in enumerate(low_values):
+        low_value += val * (100 ** (4-i))
+    return low_value
+
+LOW_MASK_POPCOUNT = tuple(bin(mask).count('1') for mask in range(256))
+# 256格低牌表：只有56個5位元遮罩是合格低牌
+LOW_RANK_TABLE = tuple(_low_rank_value(mask) for mask in range(256))
+
+def get_low_table():
+    """
+    65536格最佳低牌表（int32），索引為 手牌低牌遮罩 << 8 | 公共牌低牌遮罩，值為最佳低牌值，0表示無低牌
+    經table_store以mmap共用，檔案不存在時才建立
+    """
+    return load_table('best_low', 'i', _build_low_table)
+
+def _build_low_table():
+    """
+    列舉所有 (手牌遮罩, 公共牌遮罩) 組合，從手牌取2個、公共牌取3個互不重複的牌面
+    5張不同牌面依大到小比較等同於比較遮罩整數大小，取最小遮罩即為最佳低牌
+    """
+    bits = [[1 << bit for bit in range(8) if mask >> bit & 1] for mask in range(256)]
+    mask_pairs = [[a | b for a, b in combinations(mask_bits, 2)] for mask_bits in bits]
+    mask_triples = [[a | b | c for a, b, c in combinations(mask_bits, 3)] for mask_bits in bits]
+    
+    table = []
+    for hole_mask in range(256):
+        for board_mask in range(256):
+            best_mask = None
+            for pair in mask_pairs[hole_mask]:
+                for triple in mask_triples[board_mask]:
+                    if not pair & triple and (best_mask is None or pair | triple < best_mask):
+                        best_mask = pair | triple
+            table.append(LOW_RANK_TABLE[best_mask] if best_mask is not None else 0)
+    return table
+
+def best_low_from_masks(hole_mask, board_mask):
+    """由手牌與公共牌的低牌牌面遮罩查表求最佳低牌值，無低牌時返回None"""
+    return get_low_table()[hole_mask << 8 | board_mask] or None
+
+# 兩張手牌、三張公共牌的牌面組合（可重複）：手牌91種、公共牌455種
+RANK_PAIRS = tuple(combinations_with_replacement(range(13), 2))
+RANK_TRIPLES = tuple(combinations_with_replacement(range(13), 3))
+NUM_RANK_TRIPLES = len(RANK_TRIPLES)
+# 高牌表中同花區段的起點
+FLUSH_OFFSET = len(RANK_PAIRS) * NUM_RANK_TRIPLES
+# 有序牌面 r1*13+r2 / r1*169+r2*13+r3 -> 組合編號
+_pair_index = {ranks: i for i, ranks in enumerate(RANK_PAIRS)}
+_triple_index = {ranks: i for i, ranks in enumerate(RANK_TRIPLES)}
+RANK_PAIR_IDS = tuple(_pair_index[tuple(sorted((r1, r2)))] for r1 in range(13) for r2 in range(13))
+RANK_TRIPLE_IDS = tuple(_triple_index[tuple(sorted((r1, r2, r3)))]
+                        for r1 in range(13) for r2 in range(13) for r3 in range(13))
+
+def get_high_rank_table():
+    """
+    平面高牌表（int32），索引為 是否同花 * FLUSH_OFFSET + 手牌組合編號 * NUM_RANK_TRIPLES + 公共牌組合編號，
+    值與_evaluate_high_hand相同（不存在的組合為0）；經table_store以mmap共用，檔案不存在時才建立
+    """
+    return load_table('high_rank', 'i', _build_high_rank_table)
+
+def _build_high_rank_table():
+    """由質數乘積表展開成 [同花, 手牌組合, 公共牌組合] 的平面表"""
+    flush_table, high_table = get_high_tables()
+    table = []
+    for source in (high_table, flush_table):
+        for pair in RANK_PAIRS:
+            for triple in RANK_TRIPLES:
+                key = 1
+                for rank in pair + triple:
+                    key *= RANK_PRIMES[rank]
+                table.append(source.get(key, 0))
+    return table
+
+_high_tables = None
+
+def get_high_tables():
+    """
+    取得以質數乘積為鍵的高牌字典 (flush_table, high_table)，用於建立平面高牌表
+    兩張表的值皆為_evaluate_high_hand的強度分數：
+    flush_table 只含5張不同牌面（同花），high_table 含所有非同花牌面組合
+    """
+    global _high_tables
+    if _high_tables is None:
+        _high_tables = _build_high_tables()
+    return _high_tables
+
+def _build_high_tables():
+    """以原始評估器列舉全部6175種牌面組合建表"""
+    flush_table = {}
+    high_table = {}
+    for ranks in combinations_with_replacement(range(13), 5):
+        counts = Counter(ranks)
+        if max(counts.values()) > 4:
+            continue
+        
+        key = 1
+        for rank in ranks:
+            key *= RANK_PRIMES[rank]
+        
+        # 非同花：同一牌面的第n張使用第n種花色
+        seen = Counter()
+        codes = []
+        for rank in ranks:
+            codes.append(rank * 4 + seen[rank])
+            seen[rank] += 1
+        if len(counts) == 5:
+            # 5張不同牌面時花色會全部相同，改掉最後一張的花色
+            codes[-1] += 1
+            flush_table[key] = HandEvaluator._evaluate_high_hand([rank * 4 for rank in ranks])
+        high_table[key] = HandEvaluator._evaluate_high_hand(codes)
+    
+    return flush_table, high_table
+
+class BoardContext:
+    """
+    一個公共牌面的預先計算結果，同一牌面上所有玩家的評估共用，每個牌面只建立一次
+    三張公共牌組合的編號只保留不重複的（對子牌面有重複的組合）；沒有任何花色達到3張時
+    不可能成同花，flush_triples為空，評估時完全略過花色計算
+    """
+    
+    __slots__ = ('codes', 'triple_ids', 'flush_triples', 'flush_possible', 'low_mask', 'low_possible', 'paired')
+    
+    def __init__(self, board_codes):
+        self.codes = tuple(board_codes)
+        suit_counts = [0, 0, 0, 0]
+        low_mask = 0
+        rank_mask = 0
+        for code in self.codes:
+            suit_counts[code & 3] += 1
+            low_mask |= CODE_LOW_BITS[code]
+            rank_mask |= 1 << (code >> 2)
+        
+        triple_ids = set()
+        flush_triples = []
+        self.flush_possible = max(suit_counts) >= 3
+        for a, b, c in combinations(self.codes, 3):
+            triple_id = RANK_TRIPLE_IDS[(a >> 2) * 169 + (b >> 2) * 13 + (c >> 2)]
+            triple_ids.add(triple_id)
+            if self.flush_possible:
+                suits = CODE_SUIT_BITS[a] & CODE_SUIT_BITS[b] & CODE_SUIT_BITS[c]
+                if suits:
+                    flush_triples.append((FLUSH_OFFSET + triple_id, suits))
+        self.triple_ids = tuple(triple_ids)
+        self.flush_triples = tuple(flush_triples)
+        self.low_mask = low_mask
+        self.low_possible = LOW_MASK_POPCOUNT[low_mask] >= 3
+        self.paired = bin(rank_mask).count('1') < len(self.codes)
+
+def _new_board_triples(codes, code):
+    """公共牌codes加入code後新增的三張組合 -> (不重複的組合編號, ((同花區段索引基底, 花色位元), ...))"""
+    triple_ids = set()
+    flush_triples = []
+    for a, b in combinations(codes, 2):
+        triple_id = RANK_TRIPLE_IDS[(a >> 2) * 169 + (b >> 2) * 13 + (code >> 2)]
+        triple_ids.add(triple_id)
+        suits = CODE_SUIT_BITS[a] & CODE_SUIT_BITS[b] & CODE_SUIT_BITS[code]
+        if suits:
+            flush_triples.append((FLUSH_OFFSET + triple_id, suits))
+    return tuple(triple_ids), tuple(flush_triples)
+
+class BoardState:
+    """
+    逐張加入公共牌的評估狀態（由HandEvaluator.start_board建立），狀態不可變
+    各玩家的手牌兩張組合編碼與低牌遮罩只在建立時算一次，之後每一街共用；
+    加入一張牌時只評估包含這張牌的三張組合，其他組合的最佳高牌沿用上一街的結果，
+    因此同一張轉牌的狀態可以接上不同的河牌重複使用
+    """
+    
+    __slots__ = ('evaluator', 'players', 'codes', 'best_high', 'low_mask')
+    
+    def __init__(self, evaluator, players, codes, best_high, low_mask):
+        """
+        Args:
+            evaluator: 所屬的HandEvaluator
+            players: 每位玩家的 (手牌編碼, ((手牌組合基底, 同花色位元或0), ...), 手牌低牌遮罩)
+            codes: 目前的公共牌
+            best_high: 每位玩家目前的最佳高牌強度（公共牌不足3張時為0）
+            low_mask: 目前公共牌的低牌遮罩
+        """
+        self.evaluator = evaluator
+        self.players = players
+        self.codes = codes
+        self.best_high = best_high
+        self.low_mask = low_mask
+    
+    def add_card(self, code):
+        """加入一張公共牌，返回新的狀態"""
+        codes = self.codes + (code,)
+        low_mask = self.low_mask | CODE_LOW_BITS[code]
+        if len(codes) < 3:
+            return BoardState(self.evaluator, self.players, codes, self.best_high, low_mask)
+        
+        if self.evaluator.backend != HandEvaluator.BACKEND_LOOKUP:
+            # 對照用的後端直接重新評估整個牌面
+            get_best_high_hand_codes = self.evaluator.get_best_high_hand_codes
+            best_high = tuple(get_best_high_hand_codes(hole_codes, codes)[1] for hole_codes, _, _ in self.players)
+            return BoardState(self.evaluator, self.players, codes, best_high, low_mask)
+        
+        # 新的三張組合：新牌加上原有公共牌中任兩張；只與牌面有關，評估器有牌面快取時共用
+        board_cache = self.evaluator.board_cache
+        new_triples = None if board_cache is None else board_cache.get(codes)
+        if new_triples is None:
+            new_triples = _new_board_triples(self.codes, code)
+            if board_cache is not None:
+                board_cache[codes] = new_triples
+        triple_ids, flush_triples = new_triples
+        
+        high_table = get_high_rank_table()
+        best_high = []
+        for (_, hole_pairs, _), best_strength in zip(self.players, self.best_high):
+            for hole_base, hole_suits in hole_pairs:
+                for triple_id in triple_ids:
+                    strength = high_table[hole_base + triple_id]
+                    if strength > best_strength:
+                        best_strength = strength
+                if hole_suits and flush_triples:
+                    for flush_base, board_suits in flush_triples:
+                        if hole_suits & board_suits:
+                            strength = high_table[flush_base + hole_base]
+                            if strength > best_strength:
+                                best_strength = strength
+            best_high.append(best_strength)
+        return BoardState(self.evaluator, self.players, codes, best_high, low_mask)
+    
+    def strengths(self):
+        """每位玩家的 (hi_strength, lo_strength)，格式同get_best_hi_lo_codes"""
+        if LOW_MASK_POPCOUNT[self.low_mask] < 3:
+            return [(best_strength, None) for best_strength in self.best_high]
+        board_mask = self.low_mask
+        return [(best_strength, best_low_from_masks(hole_mask, board_mask))
+                for (_, _, hole_mask), best_strength in zip(self.players, self.best_high)]
 
 class HandEvaluator:
     """牌型評估器"""
@@ -20,21 +269,59 @@ class HandEvaluator:
     FOUR_KIND = 8
     STRAIGHT_FLUSH = 9
     
-    @staticmethod
-    def get_best_high_hand(hole_cards, board_cards):
+    # 可選的高牌評估後端
+    BACKEND_LOOKUP = 'lookup'  # 質數乘積查表（預設）
+    BACKEND_PYTHON = 'python'  # 原始Counter評估，作為對照基準
+    BACKENDS = (BACKEND_LOOKUP, BACKEND_PYTHON)
+    
+    def __init__(self, backend=BACKEND_LOOKUP, board_cache=None):
+        """
+        Args:
+            backend: 高牌評估後端
+            board_cache: 可選的字典，快取BoardState.add_card中只與公共牌有關的計算；
+                用於同一組公共牌的批次工作共用，只能由單一執行緒使用
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"無效的評估後端: {backend}")
+        self.backend = backend
+        self.board_cache = board_cache
+        if backend == self.BACKEND_LOOKUP:
+            self._score_high = HandEvaluator._lookup_high_hand
+        else:
+            self._score_high = HandEvaluator._evaluate_high_hand
+    
+    def get_best_high_hand(self, hole_cards, board_cards):
         """
         獲取最佳高牌組合
         奧瑪哈必須使用恰好2張手牌 + 3張公共牌
         """
+        best_codes, best_strength = self.get_best_high_hand_codes(
+            cards_to_ints(hole_cards), cards_to_ints(board_cards))
+        best_hand = ints_to_cards(best_codes) if best_codes else None
+        return best_hand, best_strength
+    
+    def get_best_low_hand(self, hole_cards, board_cards):
+        """
+        獲取最佳低牌組合
+        低牌要求：5張牌都是8或以下，且沒有對子，A算作1
+        """
+        best_codes, best_low_value = self.get_best_low_hand_codes(
+            cards_to_ints(hole_cards), cards_to_ints(board_cards))
+        best_hand = ints_to_cards(best_codes) if best_codes else None
+        return best_hand, best_low_value
+    
+    def get_best_high_hand_codes(self, hole_codes, board_codes):
+        """獲取最佳高牌組合（整數編碼版本，供模擬迴圈使用）"""
+        score_high = self._score_high
         best_hand = None
         best_strength = 0
         
         # 遍歷所有可能的2張手牌組合
-        for hole_combo in combinations(hole_cards, 2):
+        for hole_combo in combinations(hole_codes, 2):
             # 遍歷所有可能的3張公共牌組合
-            for board_combo in combinations(board_cards, 3):
-                hand = list(hole_combo) + list(board_combo)
-                strength = HandEvaluator._evaluate_high_hand(hand)
+            for board_combo in combinations(board_codes, 3):
+                hand = hole_combo + board_combo
+                strength = score_high(hand)
                 
                 if strength > best_strength:
                     best_strength = strength
@@ -42,37 +329,165 @@ class HandEvaluator:
         
         return best_hand, best_strength
     
-    @staticmethod
-    def get_best_low_hand(hole_cards, board_cards):
+    def get_best_hi_lo(self, hole_cards, board_cards):
         """
-        獲取最佳低牌組合
-        低牌要求：5張牌都是8或以下，且沒有對子，A算作1
+        一次遍歷同時獲取最佳高牌與低牌組合
+        公共牌少於3種8以下牌面時不可能有低牌，略過低牌評估
+        
+        Returns:
+            tuple: (hi_hand, hi_strength, lo_hand, lo_strength)，無低牌時後兩者為None
         """
-        best_hand = None
-        best_low_value = float('inf')
+        hole_codes = cards_to_ints(hole_cards)
+        board_codes = cards_to_ints(board_cards)
+        score_high = self._score_high
+        low_possible = HandEvaluator.board_low_possible(board_codes)
         
-        # 遍歷所有可能的2張手牌組合
-        for hole_combo in combinations(hole_cards, 2):
-            # 遍歷所有可能的3張公共牌組合
-            for board_combo in combinations(board_cards, 3):
-                hand = list(hole_combo) + list(board_combo)
-                low_value = HandEvaluator._evaluate_low_hand(hand)
+        best_hi_hand = None
+        best_strength = 0
+        best_lo_hand = None
+        best_low_value = None
+        
+        for hole_combo in combinations(hole_codes, 2):
+            for board_combo in combinations(board_codes, 3):
+                hand = hole_combo + board_combo
+                strength = score_high(hand)
+                if strength > best_strength:
+                    best_strength = strength
+                    best_hi_hand = hand
                 
-                if low_value is not None and low_value < best_low_value:
-                    best_low_value = low_value
-                    best_hand = hand
+                if low_possible:
+                    low_value = HandEvaluator._evaluate_low_hand(hand)
+                    if low_value is not None and (best_low_value is None or low_value < best_low_value):
+                        best_low_value = low_value
+                        best_lo_hand = hand
+        
+        return (ints_to_cards(best_hi_hand) if best_hi_hand else None, best_strength,
+                ints_to_cards(best_lo_hand) if best_lo_hand else None, best_low_value)
+    
+    def get_best_hi_lo_codes(self, hole_codes, board_codes):
+        """
+        一次遍歷同時獲取最佳高牌強度與低牌值（整數編碼版本）
+        同一牌面要評估多位玩家時，改用BoardContext與get_best_hi_lo_board共用牌面的計算
         
-        return best_hand, best_low_value if best_low_value != float('inf') else None
+        Returns:
+            tuple: (hi_strength, lo_strength)，無低牌時lo_strength為None
+        """
+        return self.get_best_hi_lo_board(hole_codes, BoardContext(board_codes))
+    
+    def get_best_hi_lo_board(self, hole_codes, board):
+        """
+        以預先計算的BoardContext評估一手牌的最佳高牌強度與低牌值（供模擬迴圈使用）
+        
+        Returns:
+            tuple: (hi_strength, lo_strength)，無低牌時lo_strength為None
+        """
+        if self.backend != self.BACKEND_LOOKUP:
+            _, best_strength = self.get_best_high_hand_codes(hole_codes, board.codes)
+        else:
+            # 非同花部分：每個手牌組合只需加上公共牌組合編號查表
+            high_table = get_high_rank_table()
+            triple_ids = board.triple_ids
+            best_strength = 0
+            for a, b in combinations(hole_codes, 2):
+                hole_base = RANK_PAIR_IDS[(a >> 2) * 13 + (b >> 2)] * NUM_RANK_TRIPLES
+                for triple_id in triple_ids:
+                    strength = high_table[hole_base + triple_id]
+                    if strength > best_strength:
+                        best_strength = strength
+                # 同花部分：只有牌面可能成同花、且兩張手牌同花色時才檢查單一花色的公共牌組合
+                if board.flush_triples and CODE_SUIT_BITS[a] & CODE_SUIT_BITS[b]:
+                    hole_suits = CODE_SUIT_BITS[a]
+                    for flush_base, board_suits in board.flush_triples:
+                        if hole_suits & board_suits:
+                            strength = high_table[flush_base + hole_base]
+                            if strength > best_strength:
+                                best_strength = strength
+        
+        if not board.low_possible:
+            return best_strength, None
+        hole_mask = 0
+        for code in hole_codes:
+            hole_mask |= CODE_LOW_BITS[code]
+        return best_strength, best_low_from_masks(hole_mask, board.low_mask)
+    
+    def start_board(self, hands_codes, board_codes=()):
+        """
+        建立逐街評估的BoardState：預先編碼所有玩家的手牌兩張組合，再依序加入已知公共牌
+        之後以add_card加入轉牌、河牌，每次只評估包含新牌的組合
+        """
+        players = []
+        for hole_codes in hands_codes:
+            hole_pairs = tuple((RANK_PAIR_IDS[(a >> 2) * 13 + (b >> 2)] * NUM_RANK_TRIPLES,
+                                CODE_SUIT_BITS[a] if a & 3 == b & 3 else 0)
+                               for a, b in combinations(hole_codes, 2))
+            hole_mask = 0
+            for code in hole_codes:
+                hole_mask |= CODE_LOW_BITS[code]
+            players.append((tuple(hole_codes), hole_pairs, hole_mask))
+        
+        state = BoardState(self, tuple(players), (), (0,) * len(players), 0)
+        for code in board_codes:
+            state = state.add_card(code)
+        return state
+    
+    @staticmethod
+    def board_low_possible(board_codes):
+        """公共牌是否有至少3種8以下的牌面（低牌成立的必要條件）"""
+        board_mask = 0
+        for code in board_codes:
+            board_mask |= CODE_LOW_BITS[code]
+        return LOW_MASK_POPCOUNT[board_mask] >= 3
+    
+    @staticmethod
+    def get_best_low_hand_codes(hole_codes, board_codes):
+        """
+        獲取最佳低牌組合（整數編碼版本）
+        先以牌面位元遮罩求出最佳低牌值，無低牌時直接返回，
+        有低牌時才依原順序找出第一個達到該值的組合
+        """
+        best_low_value = HandEvaluator.get_best_low_value_codes(hole_codes, board_codes)
+        if best_low_value is None:
+            return None, None
+        
+        for hole_combo in combinations(hole_codes, 2):
+            for board_combo in combinations(board_codes, 3):
+                hand = hole_combo + board_combo
+                if HandEvaluator._evaluate_low_hand(hand) == best_low_value:
+                    return hand, best_low_value
+    
+    @staticmethod
+    def get_best_low_value_codes(hole_codes, board_codes):
+        """獲取最佳低牌值（供模擬迴圈使用），無低牌時返回None"""
+        hole_mask = 0
+        for code in hole_codes:
+            hole_mask |= CODE_LOW_BITS[code]
+        board_mask = 0
+        for code in board_codes:
+            board_mask |= CODE_LOW_BITS[code]
+        return best_low_from_masks(hole_mask, board_mask)
+    
+    @staticmethod
+    def _lookup_high_hand(codes):
+        """
+        查表評估高牌強度（輸入為5張牌的整數編碼）
+        前2張視為手牌組合、後3張視為公共牌組合查平面高牌表，結果與_evaluate_high_hand相同
+        """
+        a, b, c, d, e = codes
+        index = (RANK_PAIR_IDS[(a >> 2) * 13 + (b >> 2)] * NUM_RANK_TRIPLES
+                 + RANK_TRIPLE_IDS[(c >> 2) * 169 + (d >> 2) * 13 + (e >> 2)])
+        if CODE_SUIT_BITS[a] & CODE_SUIT_BITS[b] & CODE_SUIT_BITS[c] & CODE_SUIT_BITS[d] & CODE_SUIT_BITS[e]:
+            index += FLUSH_OFFSET
+        return get_high_rank_table()[index]
     
     @staticmethod
-    def _evaluate_high_hand(cards):
-        """評估高牌強度"""
-        if len(cards) != 5:
+    def _evaluate_high_hand(codes):
+        """評估高牌強度（輸入為5張牌的整數編碼）"""
+        if len(codes) != 5:
             raise ValueError("手牌必須是5張")
         
         # 獲取牌面值和花色
-        values = [card.value for card in cards]
-        suits = [card.suit for card in cards]
+        values = [(code >> 2) + 2 for code in codes]
+        suits = [code & 3 for code in codes]
         
         values.sort(reverse=True)
         value_counts = Counter(values)
@@ -133,21 +548,22 @@ class HandEvaluator:
         return score
     
     @staticmethod
-    def _evaluate_low_hand(cards):
+    def _evaluate_low_hand(codes):
         """
-        評估低牌
+        評估低牌（輸入為5張牌的整數編碼）
         返回None如果不符合低牌條件，否則返回低牌值（越小越好）
         """
-        if len(cards) != 5:
+        if len(codes) != 5:
             return None
         
         # 獲取低牌值（A=1, 其他牌面值不變）
         low_values = []
-        for card in cards:
-            if card.rank == 'A':
+        for code in codes:
+            rank_index = code >> 2
+            if rank_index == 12:  # A
                 low_values.append(1)
-            elif card.value <= 8:  # 2-8
-                low_values.append(card.value)
+            elif rank_index <= 6:  # 2-8
+                low_values.append(rank_index + 2)
             else:  # 9, T, J, Q, K
                 return None  # 有大牌，不符合低牌條件
         
@@ -198,4 +614,4 @@ class HandEvaluator:
             HandEvaluator.STRAIGHT_FLUSH: "同花順"
         }
         
-        return descriptions.get(hand_type, f"未知牌型({hand_type})")
\ No newline at end of file
+        return descriptions.get(hand_type, f"未知牌型({hand_type})")
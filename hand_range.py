@@ -0,0 +1,398 @@
+"""
+手牌範圍：加權的5張手牌組合集合與範圍語法
+
+範圍語法（以逗號分隔多個項目，每個項目可加 :權重，預設為1）：
+    As Ah 2s 3h Kd      指定的一手牌（可省略空白：AsAh2s3hKd）
+    A2xxx               牌面樣式：x為任意牌，不足5張時以x補齊（AA 等同 AAxxx）
+    AsKxx               牌面後加花色表示指定的牌，xh表示任意一張紅心
+    AA2xx ds            以空白加上ds（雙同花：至少兩種花色各有2張以上）或ss（單同花：只有一種花色有2張以上）
+    random              任意手牌（不能與其他項目混合）
+例如: "AA2xx ds, A23xx:0.5, KKQQx"
+"""
+
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import combinations, product
+from math import comb
+from card import Card, codes_to_mask, mask_to_codes, parse_cards
+
+RANK_CHARS = '23456789TJQKA'
+SUIT_CHARS = 'shdc'
+# 範圍展開後的組合數上限（例如A2xxx約26萬種），避免單一過寬的樣式列舉數百萬種組合
+MAX_RANGE_COMBOS = 400000
+# 手牌輸入中表示範圍語法的字元（x為任意牌、:為權重、逗號分隔多個項目）
+RANGE_MARKERS = ('x', ':', ',')
+# 條件抽樣時剩餘組合的權重比例不低於此值就以重抽的方式抽樣（平均最多重抽1/此值次），否則直接定位
+MIN_REJECTION_FRACTION = 1 / 256
+# 在位元集合中定位第n個組合時每次計數的位元數
+BIT_SCAN_CHUNK = 4096
+# 各花色13張牌的遮罩
+SUIT_MASKS = tuple(sum(1 << code for code in range(suit, 52, 4)) for suit in range(4))
+
+class HandRange:
+    """
+    加權手牌範圍：組合以52位元遮罩存放在可索引的陣列中，依累積權重抽樣；
+    另以每張牌的組合位元集合快速篩選出不含已發出牌的組合（條件抽樣用）
+    隨機範圍（任意手牌）不建表，直接從剩餘牌中抽5張
+    """
+    
+    def __init__(self, masks=(), weights=None, text='', is_random=False, live_mask=(1 << 52) - 1,
+                 index_source=None):
+        """
+        Args:
+            masks: 組合遮罩（不重複）
+            weights: 對應的權重，None表示全部相同
+            text: 範圍的文字表示（顯示用）
+            is_random: 是否為隨機範圍
+            live_mask: 隨機範圍可使用的牌
+            index_source: (原範圍, 已排除的牌遮罩)，restrict產生的範圍沿用原範圍的位元索引
+        """
+        self.masks = array('Q', masks)
+        self.weights = None if weights is None else array('d', weights)
+        self.text = text
+        self.is_random = is_random
+        self.live_mask = live_mask
+        # 隨機範圍抽牌用的可用牌列表
+        self.live_codes = mask_to_codes(live_mask) if is_random else None
+        self.cumulative = None
+        self.total_weight = float(len(self.masks))
+        if self.weights is not None:
+            total = 0.0
+            self.cumulative = array('d')
+            for weight in self.weights:
+                total += weight
+                self.cumulative.append(total)
+            self.total_weight = total
+        # 每張牌 -> 含有該牌的組合位元集合（第i位代表masks[i]），第一次條件抽樣時才建立
+        self.index_source = (self, 0) if index_source is None else index_source
+        self._index = None
+    
+    @classmethod
+    def random_hands(cls):
+        """任意手牌的範圍"""
+        return cls(text='random', is_random=True)
+    
+    @classmethod
+    def from_combos(cls, combos, text=None):
+        """
+        由明確的組合列表建立範圍
+        
+        Args:
+            combos: 每個元素為5張牌（Card列表或整數編碼），或 (5張牌, 權重)
+        """
+        weights_by_mask = {}
+        for combo in combos:
+            weight = 1.0
+            if len(combo) == 2:
+                combo, weight = combo
+            codes = [card.code if isinstance(card, Card) else card for card in combo]
+            mask = codes_to_mask(codes)
+            if len(codes) != 5 or bin(mask).count('1') != 5:
+                raise ValueError(f"組合必須是5張不同的牌: {combo}")
+            weights_by_mask[mask] = float(weight)
+        return cls._from_weights(weights_by_mask, text or f'{len(weights_by_mask)} 種組合')
+    
+    @classmethod
+    def _from_weights(cls, weights_by_mask, text):
+        """遮罩 -> 權重 字典建立範圍，權重全為1時不存權重"""
+        masks = sorted(weights_by_mask)
+        weights = [weights_by_mask[mask] for mask in masks]
+        if all(weight == 1.0 for weight in weights):
+            weights = None
+        return cls(masks, weights, text)
+    
+    def __len__(self):
+        return len(self.masks)
+    
+    def __str__(self):
+        return self.text
+    
+    def restrict(self, dead_mask):
+        """移除含有dead_mask中任何一張牌的組合，返回新的範圍（用於排除公共牌與已知手牌）"""
+        if self.is_random:
+            return HandRange(text=self.text, is_random=True, live_mask=self.live_mask & ~dead_mask)
+        keep = [i for i, mask in enumerate(self.masks) if not mask & dead_mask]
+        weights = None if self.weights is None else [self.weights[i] for i in keep]
+        source, source_dead_mask = self.index_source
+        return HandRange([self.masks[i] for i in keep], weights, self.text,
+                         index_source=(source, source_dead_mask | dead_mask))
+    
+    def is_empty(self):
+        """範圍中是否沒有任何組合"""
+        if self.is_random:
+            return bin(self.live_mask).count('1') < 5
+        return not self.masks
+    
+    def draw(self, random_func):
+        """依權重抽出一個組合，返回組合遮罩（不考慮其他玩家的牌）"""
+        if self.is_random:
+            return self._draw_random(0, random_func)
+        return self._draw(self.masks, self.cumulative, random_func)
+    
+    def draw_given(self, dealt_mask, random_func):
+        """
+        以已發出的牌為條件抽樣：只從不含dealt_mask中任何牌的組合依權重抽一個
+        
+        Returns:
+            tuple: (組合遮罩, 剩餘組合的權重佔整個範圍的比例)，沒有剩餘組合時為 (None, 0.0)
+        """
+        if not dealt_mask:
+            return self.draw(random_func), 1.0
+        if self.is_random:
+            live_count = bin(self.live_mask).count('1')
+            surviving = comb(live_count - bin(self.live_mask & dealt_mask).count('1'), 5)
+            if not surviving:
+                return None, 0.0
+            return self._draw_random(dealt_mask, random_func), surviving / comb(live_count, 5)
+        
+        source, source_dead_mask = self.index_source
+        alive_classes = source._alive_classes(source_dead_mask | dealt_mask)
+        class_weights = [weight * _popcount(bits) for weight, bits in alive_classes]
+        fraction = min(sum(class_weights) / self.total_weight, 1.0)
+        if not fraction:
+            return None, 0.0
+        if fraction >= MIN_REJECTION_FRACTION:
+            # 剩餘比例不太小時直接由整個範圍抽樣、含已發出的牌就重抽，結果即條件分佈
+            while True:
+                mask = self._draw(self.masks, self.cumulative, random_func)
+                if not mask & dealt_mask:
+                    return mask, fraction
+        # 剩餘比例很小時依權重選一個權重類別，再均勻選出類別中第幾個剩餘組合
+        target = random_func() * sum(class_weights)
+        for (weight, bits), class_weight in zip(alive_classes, class_weights):
+            if class_weight:
+                chosen = weight, bits
+                if target < class_weight:
+                    break
+                target -= class_weight
+        weight, bits = chosen
+        position = _nth_set_bit(bits, min(int(target / weight), _popcount(bits) - 1))
+        return source.masks[position], fraction
+    
+    def _draw_random(self, dealt_mask, random_func):
+        """隨機範圍：從可用且不在dealt_mask中的牌均勻抽5張，重複或已發出的牌重抽，不修改任何共用狀態"""
+        live_codes = self.live_codes
+        mask = 0
+        count = 0
+        while count < 5:
+            bit = 1 << live_codes[int(random_func() * len(live_codes))]
+            if not (mask | dealt_mask) & bit:
+                mask |= bit
+                count += 1
+        return mask
+    
+    @staticmethod
+    def _draw(masks, cumulative, random_func):
+        """從masks中抽一個組合：cumulative為累積權重，None表示均勻抽樣"""
+        if cumulative is None:
+            return masks[int(random_func() * len(masks))]
+        index = bisect_right(cumulative, random_func() * cumulative[-1])
+        return masks[min(index, len(masks) - 1)]
+    
+    def _alive_classes(self, dead_mask):
+        """各權重類別中不含dead_mask任何牌的組合位元集合，返回 [(權重, 位元集合)]"""
+        card_bits, weight_classes = self._index or self._build_index()
+        blocked = 0
+        for code in mask_to_codes(dead_mask):
+            blocked |= card_bits[code]
+        return [(weight, bits & ~blocked) for weight, bits in weight_classes]
+    
+    def _build_index(self):
+        """建立每張牌與每個權重類別的組合位元集合（可能被多個執行緒同時建立，結果相同）"""
+        num_bytes = (len(self.masks) + 7) >> 3
+        card_bytes = [bytearray(num_bytes) for _ in range(52)]
+        class_bytes = {}
+        for index, mask in enumerate(self.masks):
+            byte, bit = index >> 3, 1 << (index & 7)
+            for code in mask_to_codes(mask):
+                card_bytes[code][byte] |= bit
+            if self.weights is not None:
+                weight = self.weights[index]
+                if weight not in class_bytes:
+                    class_bytes[weight] = bytearray(num_bytes)
+                class_bytes[weight][byte] |= bit
+        if self.weights is None:
+            class_bytes = {1.0: b'\xff' * num_bytes}
+        all_bits = (1 << len(self.masks)) - 1
+        self._index = ([int.from_bytes(data, 'little') for data in card_bytes],
+                       [(weight, int.from_bytes(data, 'little') & all_bits) for weight, data in class_bytes.items()])
+        return self._index
+
+def deal_ranges(ranges, random_func):
+    """
+    依序替每個範圍抽一個組合（序列重要性抽樣）
+    每個範圍只從不含前面範圍已發出牌的組合中依權重抽樣（以位元索引篩選，不會整局重抽），
+    該局的權重為各範圍剩餘權重比例的乘積；以權重加權後的結果服從所有互不衝突組合的聯合分佈
+    
+    Returns:
+        tuple: (各範圍的組合遮罩, 權重)，某個範圍已沒有不衝突的組合時為 (None, 0.0)
+    """
+    dealt_mask = 0
+    deal_weight = 1.0
+    masks = []
+    for hand_range in ranges:
+        mask, fraction = hand_range.draw_given(dealt_mask, random_func)
+        if mask is None:
+            return None, 0.0
+        dealt_mask |= mask
+        deal_weight *= fraction
+        masks.append(mask)
+    return masks, deal_weight
+
+def _popcount(bits):
+    """位元集合中1的個數"""
+    return bin(bits).count('1')
+
+def _nth_set_bit(bits, n):
+    """位元集合中由低位起第n個（從0起算）為1的位元位置"""
+    digits = bin(bits)[:1:-1]
+    start = 0
+    while True:
+        ones = digits.count('1', start, start + BIT_SCAN_CHUNK)
+        if n < ones:
+            break
+        n -= ones
+        start += BIT_SCAN_CHUNK
+    position = start - 1
+    for _ in range(n + 1):
+        position = digits.find('1', position + 1)
+    return position
+
+def parse_hand_or_range(text):
+    """
+    玩家輸入 -> 5張牌的列表（一手確定的牌）或HandRange
+    只有含明確範圍語法（x、:權重、逗號、ds/ss或random）的輸入才視為範圍，
+    其餘一律當作確定的手牌，張數不對時直接報錯，不會把打錯的手牌當成範圍
+    """
+    if not is_range_text(text):
+        cards = parse_cards(text)
+        if len(cards) != 5:
+            raise ValueError(f"手牌必須是5張，目前是{len(cards)}張")
+        return cards
+    return parse_range(text)
+
+def is_range_text(text):
+    """輸入是否含有明確的範圍語法"""
+    words = text.lower().replace(',', ' ').split()
+    return (any(marker in text.lower() for marker in RANGE_MARKERS)
+            or any(word in ('ds', 'ss', 'random') for word in words))
+
+@lru_cache(maxsize=256)
+def parse_range(text):
+    """解析範圍語法，返回HandRange（相同文字的結果會被快取）"""
+    weights_by_mask = {}
+    entries = [entry.strip() for entry in text.split(',') if entry.strip()]
+    if not entries:
+        raise ValueError("範圍不能是空的")
+    
+    for entry in entries:
+        body, _, weight_text = entry.partition(':')
+        weight = 1.0
+        if weight_text:
+            try:
+                weight = float(weight_text)
+            except ValueError:
+                raise ValueError(f"無效的權重: {entry}")
+            if weight <= 0:
+                raise ValueError(f"權重必須是正數: {entry}")
+        
+        if body.strip().lower() == 'random':
+            if len(entries) > 1:
+                raise ValueError("random 不能與其他範圍項目混合")
+            return HandRange.random_hands()
+        
+        for mask in _expand_entry(body):
+            weights_by_mask[mask] = weight
+    
+    if not weights_by_mask:
+        raise ValueError(f"範圍中沒有任何組合: {text}")
+    return HandRange._from_weights(weights_by_mask, text.strip())
+
+def _expand_entry(body):
+    """單一範圍項目 -> 符合的組合遮罩集合"""
+    words = body.split()
+    suitedness = None
+    if len(words) > 1 and words[-1].lower() in ('ds', 'ss'):
+        suitedness = words.pop().lower()
+    tokens = _parse_pattern(''.join(words))
+    
+    if all(rank is None and suit is None for rank, suit in tokens) and suitedness is None:
+        raise ValueError("任意手牌請使用 random")
+    
+    masks = _expand_pattern(tokens)
+    if suitedness is not None:
+        masks = {mask for mask in masks if _suitedness(mask) == suitedness}
+    return masks
+
+def _parse_pattern(pattern):
+    """牌面樣式 -> [(牌面索引或None, 花色索引或None)] * 5"""
+    tokens = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i].upper()
+        if char == 'X':
+            rank = None
+        elif char in RANK_CHARS:
+            rank = RANK_CHARS.index(char)
+        else:
+            raise ValueError(f"無效的範圍: {pattern}")
+        suit = None
+        if i + 1 < len(pattern) and pattern[i + 1].lower() in SUIT_CHARS:
+            suit = SUIT_CHARS.index(pattern[i + 1].lower())
+            i += 1
+        tokens.append((rank, suit))
+        i += 1
+    
+    if len(tokens) > 5:
+        raise ValueError(f"範圍樣式最多5張牌: {pattern}")
+    return tokens + [(None, None)] * (5 - len(tokens))
+
+def _expand_pattern(tokens):
+    """
+    列舉符合樣式的所有組合
+    有限制的牌（指定牌面或花色）逐組選出互不重複的牌，其餘的x再從剩下的牌中任取
+    """
+    groups = {}
+    for token in tokens:
+        if token != (None, None):
+            groups[token] = groups.get(token, 0) + 1
+    wildcard_count = 5 - sum(groups.values())
+    
+    group_candidates = []
+    for (rank, suit), count in groups.items():
+        candidates = [code for code in range(52)
+                      if (rank is None or code >> 2 == rank) and (suit is None or code & 3 == suit)]
+        group_candidates.append((candidates, count))
+    
+    # 列舉前先估計組合數的上限，過寬的樣式直接拒絕
+    estimate = comb(52 - (5 - wildcard_count), wildcard_count)
+    for candidates, count in group_candidates:
+        estimate *= comb(len(candidates), count)
+    if estimate > MAX_RANGE_COMBOS:
+        raise ValueError(f"範圍太大（約 {estimate} 種組合，上限 {MAX_RANGE_COMBOS}），請加上更多限制的牌")
+    
+    # 相同的限制一起用combinations選牌，避免同一組合的排列重複出現
+    group_choices = [[codes_to_mask(choice) for choice in combinations(candidates, count)]
+                     for candidates, count in group_candidates]
+    
+    masks = set()
+    for choice in product(*group_choices):
+        fixed_mask = 0
+        for mask in choice:
+            if fixed_mask & mask:
+                break
+            fixed_mask |= mask
+        else:
+            free_codes = [code for code in range(52) if not fixed_mask >> code & 1]
+            for extra in combinations(free_codes, wildcard_count):
+                mask = fixed_mask
+                for code in extra:
+                    mask |= 1 << code
+                masks.add(mask)
+    return masks
+
+def _suitedness(mask):
+    """組合的同花型態：兩種以上花色有2張以上為ds，否則為ss（5張牌至少有一種花色有2張）"""
+    suited_suits = sum(1 for suit_mask in SUIT_MASKS if bin(mask & suit_mask).count('1') >= 2)
+    return 'ds' if suited_suits >= 2 else 'ss'
@@ -29,7 +29,7 @@ def print_equity_results(results):
         print(f"錯誤: {results['error']}")
         return
     
-    print(f"模擬次數: {results['simulations']:,}")
+    print(f"{'窮舉牌面數' if results['player1']['exact'] else '模擬次數'}: {results['simulations']:,}")
     print()
     
     for player_name, stats in results.items():
@@ -150,7 +150,9 @@ def main():
                 
                 print_separator()
                 print("多人勝率結果:")
-                print(f"模擬次數: {simulations:,}")
+                # 牌面數不多時自動改為窮舉，顯示實際計算的牌面數
+                first_stats = results['player_1']
+                print(f"{'窮舉牌面數' if first_stats['exact'] else '模擬次數'}: {first_stats['trials']:,}")
                 print()
                 
                 for i, player_name in enumerate(sorted(results.keys())):
@@ -22,6 +22,8 @@ class ModernOmahaGUI:
         
         # 計算器實例
         self.calculator = OmahaHiLoEquityCalculator()
+        # 進行中計算的取消標記，沒有計算時為None
+        self.cancel_event = None
         
         # 遊戲狀態
         self.num_players = 2
@@ -119,9 +121,14 @@ class ModernOmahaGUI:
                                          command=self.calculate_equity)
         self.calculate_button.pack(side='left', padx=2)
         
-        # 進度條
-        self.progress = ttk.Progressbar(right_controls, mode='indeterminate', length=100)
+        # 進度條與計算中的即時勝率
+        self.progress = ttk.Progressbar(right_controls, mode='determinate', length=100, maximum=100)
         self.progress.pack(side='left', padx=5)
+        
+        self.progress_label = tk.Label(right_controls, text="",
+                                       font=('微軟正黑體', 9),
+                                       bg='#2c3e50', fg='#ecf0f1')
+        self.progress_label.pack(side='left', padx=5)
     
     def create_table_area(self, parent):
         """創建牌桌區域"""
@@ -397,7 +404,8 @@ class ModernOmahaGUI:
         self.selection_label.config(text=f"已選擇: {count} 張")
     
     def update_display(self):
-        """更新整體顯示"""
+        """更新整體顯示（手牌或公共牌改變時呼叫，同時取消進行中的計算）"""
+        self.cancel_calculation()
         self.update_selection_display()
         
         # 更新公共牌顯示
@@ -554,19 +562,26 @@ class ModernOmahaGUI:
         
         board = [cw.card for cw in self.board_cards] if self.board_cards else []
         
-        # 開始計算
-        self.calculate_button.config(state='disabled', text=f'計算{calculation_type}勝率中...')
-        self.progress.start()
+        # 開始計算：計算中按鈕改為停止，停止時以目前已完成的模擬顯示結果；
+        # 計算中改動手牌或公共牌則取消這次計算，結果不再顯示
+        cancel_event = threading.Event()
+        self.cancel_event = cancel_event
+        self.calculate_button.config(text='⏹ 停止計算', command=self.stop_calculation)
+        self.progress['value'] = 0
         
         def calculate():
             try:
                 simulations = 10000
-                results = self.calculator.calculate_equity(player_hands, board, simulations)
-                self.root.after(0, lambda: self.show_results(results, calculation_type))
+                results = None
+                for trials_done, total_trials, results in self.calculator.iter_equity(
+                        player_hands, board, simulations, batch_size=500, cancel=cancel_event):
+                    self.root.after(0, lambda done=trials_done, total=total_trials, snapshot=results:
+                                    self.update_progress(cancel_event, done, total, snapshot))
+                self.root.after(0, lambda: self.show_current_results(cancel_event, results, calculation_type))
             except Exception as e:
                 self.root.after(0, lambda: messagebox.showerror("錯誤", f"計算錯誤: {str(e)}"))
             finally:
-                self.root.after(0, self.calculation_finished)
+                self.root.after(0, lambda: self.calculation_finished(cancel_event))
         
         thread = threading.Thread(target=calculate)
         thread.daemon = True
@@ -594,7 +609,7 @@ class ModernOmahaGUI:
 {'='*65}
 玩家數量: {self.num_players}
 計算類型: {calculation_type}
-模擬次數: 10,000 次
+{'窮舉牌面數' if results['player_1']['exact'] else '模擬次數'}: {results['player_1']['trials']:,} 次
 
 💡 總勝率說明：表示該玩家在長期中平均能獲得多少比例的底池
    在奧瑪哈高低牌中，底池通常分為高牌底池(50%)和低牌底池(50%)
@@ -625,10 +640,40 @@ class ModernOmahaGUI:
         
         results_text.insert('end', output)
     
-    def calculation_finished(self):
-        """計算完成"""
-        self.calculate_button.config(state='normal', text='🎲 計算勝率')
-        self.progress.stop()
+    def update_progress(self, cancel_event, trials_done, total_trials, results):
+        """更新進度條與目前各玩家的勝率（已被取代的計算不更新）"""
+        if self.cancel_event is not cancel_event:
+            return
+        self.progress['value'] = trials_done / total_trials * 100
+        self.progress_label.config(text='  '.join(
+            f'P{i+1} {stats["equity"]:.1f}%' for i, stats in enumerate(results.values())))
+    
+    def stop_calculation(self):
+        """停止計算，以目前的結果顯示"""
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+            self.calculate_button.config(state='disabled', text='停止中...')
+    
+    def cancel_calculation(self):
+        """取消進行中的計算且不顯示結果（牌面已改變，結果已過時）"""
+        cancel_event = self.cancel_event
+        if cancel_event is not None:
+            self.calculation_finished(cancel_event)
+            cancel_event.set()
+    
+    def show_current_results(self, cancel_event, results, calculation_type):
+        """顯示計算結果，已被取代的計算不顯示"""
+        if self.cancel_event is cancel_event:
+            self.show_results(results, calculation_type)
+    
+    def calculation_finished(self, cancel_event):
+        """計算結束（已被取代的計算不影響目前的狀態）"""
+        if self.cancel_event is not cancel_event:
+            return
+        self.cancel_event = None
+        self.calculate_button.config(state='normal', text='🎲 計算勝率', command=self.calculate_equity)
+        self.progress['value'] = 0
+        self.progress_label.config(text='')
 
 def main():
     root = tk.Tk()
@@ -636,4 +681,4 @@ def main():
     root.mainloop()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
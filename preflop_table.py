@@ -0,0 +1,186 @@
+"""
+翻牌前勝率表：每種花色同構的5張起手牌，單挑一手隨機牌的預先計算勝率
+
+檔案格式（小端序）：
+    header  : 8位元組魔數 + uint32 條目數 + uint32 保留
+    keys    : uint64 * N，由小到大排序的起手牌同構鍵
+    equity  : float32 * N，勝率（百分比）
+    trials  : uint32 * N，已模擬次數（0表示尚未計算）
+
+建表（可中斷後續跑、可平行）：
+    python preflop_table.py build --trials 20000 --workers 4
+查詢：
+    python preflop_table.py lookup "As Ah 2s 3h Kd"
+"""
+
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+from bisect import bisect_left
+from contextlib import nullcontext
+from itertools import combinations
+from card import parse_cards, cards_to_ints
+from hand_evaluator import HandEvaluator
+from equity_calculator import COUNTER_FIELDS, process_pool, simulate_vs_random_counts
+
+MAGIC = b'PLO8PF01'
+HEADER = struct.Struct('<8sII')
+DEFAULT_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'preflop_equity.bin')
+
+def hand_key(hand_codes):
+    """
+    起手牌的花色同構鍵：各花色的牌面位元遮罩由大到小排列後，每個佔13位元打包
+    只差花色排列的起手牌得到相同的鍵
+    """
+    suit_masks = [0, 0, 0, 0]
+    for code in hand_codes:
+        suit_masks[code & 3] |= 1 << (code >> 2)
+    suit_masks.sort(reverse=True)
+    return suit_masks[0] << 39 | suit_masks[1] << 26 | suit_masks[2] << 13 | suit_masks[3]
+
+def key_to_hand(key):
+    """同構鍵 -> 代表元起手牌（第i大的遮罩使用第i種花色）"""
+    codes = []
+    for suit in range(4):
+        suit_mask = key >> (39 - 13 * suit) & 0x1FFF
+        codes.extend(rank * 4 + suit for rank in range(13) if suit_mask >> rank & 1)
+    return codes
+
+def all_hand_keys():
+    """列舉全部2,598,960手起手牌，返回排序後的同構鍵（134,459種）"""
+    return sorted({hand_key(hand) for hand in combinations(range(52), 5)})
+
+def simulate_vs_random(hand_codes, num_trials, rng, evaluator=None):
+    """
+    模擬一手牌對一手隨機牌的勝率（百分比）
+    每局從剩餘47張中以部分Fisher–Yates抽出對手5張與公共牌5張，共用同一個緩衝區
+    """
+    counters = simulate_vs_random_counts(evaluator or HandEvaluator(), hand_codes, [], 1, num_trials, rng)
+    return counters[COUNTER_FIELDS.index('total_value')] / num_trials * 100
+
+def _build_chunk(keys, num_trials, seed):
+    """建表工作單元：計算一批起手牌，每手牌的亂數種子由seed與鍵決定，與分批方式無關"""
+    evaluator = HandEvaluator()
+    return [simulate_vs_random(key_to_hand(key), num_trials, random.Random(seed << 64 | key), evaluator)
+            for key in keys]
+
+class PreflopEquityTable:
+    """以mmap唯讀開啟的翻牌前勝率表"""
+    
+    def __init__(self, path=DEFAULT_TABLE_PATH):
+        self.path = path
+        with open(path, 'rb') as table_file:
+            self._mmap = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, _ = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"無效的翻牌前勝率表: {path}")
+        self.keys, self.equity, self.trials = _table_views(memoryview(self._mmap), self.count)
+    
+    def lookup(self, hand_codes):
+        """查詢起手牌對一手隨機牌的 (勝率百分比, 模擬次數)，尚未計算時返回None"""
+        key = hand_key(hand_codes)
+        index = bisect_left(self.keys, key)
+        if index == self.count or self.keys[index] != key or self.trials[index] == 0:
+            return None
+        return self.equity[index], self.trials[index]
+
+def _table_views(buffer, count):
+    """將整個檔案的memoryview切成 keys / equity / trials 三個型別化視圖"""
+    offset = HEADER.size
+    keys = buffer[offset:offset + 8 * count].cast('Q')
+    offset += 8 * count
+    equity = buffer[offset:offset + 4 * count].cast('f')
+    offset += 4 * count
+    trials = buffer[offset:offset + 4 * count].cast('I')
+    return keys, equity, trials
+
+_loaded_tables = {}
+
+def load_preflop_table(path=DEFAULT_TABLE_PATH):
+    """
+    取得已開啟的翻牌前勝率表（每個路徑只開啟一次），檔案不存在時返回None
+    不存在的結果不快取，執行中才建好的表在下一次查詢時就會被開啟
+    """
+    table = _loaded_tables.get(path)
+    if table is None and os.path.exists(path):
+        table = _loaded_tables[path] = PreflopEquityTable(path)
+    return table
+
+def build_table(path=DEFAULT_TABLE_PATH, num_trials=20000, workers=1, chunk_size=200, seed=0, limit=None):
+    """
+    建立或續跑翻牌前勝率表
+    檔案不存在時先寫入全部鍵並將模擬次數歸零；之後只計算模擬次數少於num_trials的條目，
+    每完成一批立即寫回檔案，因此中斷後重新執行即可從上次進度繼續
+    """
+    if not os.path.exists(path):
+        keys = all_hand_keys()
+        with open(path, 'wb') as table_file:
+            table_file.write(HEADER.pack(MAGIC, len(keys), 0))
+            table_file.write(struct.pack(f'<{len(keys)}Q', *keys))
+            table_file.write(bytes(8 * len(keys)))
+    
+    with open(path, 'r+b') as table_file:
+        table_map = mmap.mmap(table_file.fileno(), 0)
+        _, count, _ = HEADER.unpack_from(table_map, 0)
+        keys, equity, trials = _table_views(memoryview(table_map), count)
+        
+        pending = [i for i in range(count) if trials[i] < num_trials]
+        if limit is not None:
+            pending = pending[:limit]
+        chunks = [pending[start:start + chunk_size] for start in range(0, len(pending), chunk_size)]
+        print(f"待計算 {len(pending)} / {count} 種起手牌，共 {len(chunks)} 批")
+        
+        with process_pool(workers) if workers > 1 else nullcontext() as pool:
+            if pool is not None:
+                futures = [(chunk, pool.submit(_build_chunk, [keys[i] for i in chunk], num_trials, seed))
+                           for chunk in chunks]
+                results = ((chunk, future.result()) for chunk, future in futures)
+            else:
+                results = ((chunk, _build_chunk([keys[i] for i in chunk], num_trials, seed)) for chunk in chunks)
+            
+            for done, (chunk, chunk_equity) in enumerate(results, 1):
+                for i, value in zip(chunk, chunk_equity):
+                    equity[i] = value
+                    trials[i] = num_trials
+                table_map.flush()
+                print(f"  已完成 {done}/{len(chunks)} 批")
+        
+        del keys, equity, trials
+        table_map.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="翻牌前勝率表（5張奧瑪哈高低牌，單挑一手隨機牌）")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    build_parser = subparsers.add_parser('build', help='建立或續跑勝率表')
+    build_parser.add_argument('--output', default=DEFAULT_TABLE_PATH, help='表格檔案路徑')
+    build_parser.add_argument('--trials', type=int, default=20000, help='每種起手牌的模擬次數')
+    build_parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='平行工作進程數')
+    build_parser.add_argument('--chunk-size', type=int, default=200, help='每批起手牌數（每批完成後寫回檔案）')
+    build_parser.add_argument('--seed', type=int, default=0, help='亂數種子')
+    build_parser.add_argument('--limit', type=int, default=None, help='本次最多計算的起手牌數')
+    
+    lookup_parser = subparsers.add_parser('lookup', help='查詢起手牌勝率')
+    lookup_parser.add_argument('hand', help='5張手牌，例如 "As Ah 2s 3h Kd"')
+    lookup_parser.add_argument('--table', default=DEFAULT_TABLE_PATH, help='表格檔案路徑')
+    
+    args = parser.parse_args()
+    if args.command == 'build':
+        build_table(args.output, args.trials, args.workers, args.chunk_size, args.seed, args.limit)
+    else:
+        hand = parse_cards(args.hand)
+        if len(hand) != 5:
+            print("手牌必須是5張")
+            sys.exit(1)
+        table = load_preflop_table(args.table)
+        entry = table.lookup(cards_to_ints(hand)) if table else None
+        if entry is None:
+            print("勝率表中沒有這手牌的資料")
+            sys.exit(1)
+        print(f"{args.hand}: {entry[0]:.2f}% （{entry[1]:,} 次模擬）")
+
+if __name__ == '__main__':
+    main()
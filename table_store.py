@@ -0,0 +1,97 @@
+"""
+查找表存放：把預先計算的表存成平面二進位檔，使用時以mmap唯讀映射
+表在第一次使用時才建立並寫入檔案，之後每個進程（包括fork出的Flask工作進程）
+都直接映射同一個檔案，經由作業系統頁快取共用，不需各自在Python中重建或持有私有副本
+
+檔案格式：8位元組魔數 + 1位元組型別碼 + 7位元組保留 + uint64 元素數，其後為原生位元組序的資料
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from array import array
+
+MAGIC = b'OMHTBL01'
+HEADER = struct.Struct('=8sc7xQ')
+# 表格目錄，可用環境變數OMAHA_TABLE_DIR指定
+TABLE_DIR = os.environ.get('OMAHA_TABLE_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tables')
+
+_tables = {}
+_lock = threading.Lock()
+
+def table_path(name):
+    """表格名稱 -> 檔案路徑"""
+    return os.path.join(TABLE_DIR, f'{name}.bin')
+
+def load_table(name, typecode, builder):
+    """
+    取得唯讀的表格視圖（memoryview，型別碼同array模組，例如'i'為int32）
+    需要numpy陣列時可用numpy.frombuffer直接包裝，不會複製資料
+    檔案不存在時呼叫builder()產生資料並寫入；目錄無法寫入時退回記憶體中的表
+    
+    Args:
+        name: 表格名稱（同時是檔名）
+        typecode: array型別碼
+        builder: 無參數函數，返回可迭代的數值
+    """
+    table = _tables.get(name)
+    if table is not None:
+        return table
+    
+    with _lock:
+        table = _tables.get(name)
+        if table is None:
+            table = _tables[name] = _open_or_build(name, typecode, builder)
+    return table
+
+def _open_or_build(name, typecode, builder):
+    """映射既有檔案；不存在或格式不符時重新建立"""
+    path = table_path(name)
+    table = _map_file(path, typecode)
+    if table is not None:
+        return table
+    
+    data = array(typecode, builder())
+    try:
+        _write_file(path, typecode, data)
+    except OSError:
+        return memoryview(data)
+    table = _map_file(path, typecode)
+    return table if table is not None else memoryview(data)
+
+def _map_file(path, typecode):
+    """唯讀映射表格檔案，返回資料部分的型別化memoryview；檔案不存在或格式不符時返回None"""
+    try:
+        with open(path, 'rb') as table_file:
+            mapped = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    
+    if len(mapped) < HEADER.size:
+        mapped.close()
+        return None
+    magic, stored_typecode, count = HEADER.unpack_from(mapped, 0)
+    itemsize = array(typecode).itemsize
+    if (magic != MAGIC or stored_typecode != typecode.encode()
+            or len(mapped) != HEADER.size + count * itemsize):
+        mapped.close()
+        return None
+    return memoryview(mapped)[HEADER.size:].cast(typecode)
+
+def _write_file(path, typecode, data):
+    """先寫入暫存檔再原子性改名，多個進程同時建表也不會讀到寫了一半的檔案"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as table_file:
+            table_file.write(HEADER.pack(MAGIC, typecode.encode(), len(data)))
+            table_file.write(data.tobytes())
+        # mkstemp建立的檔案權限為0600，改為所有使用者可讀，其他帳號執行的工作進程才能映射同一個檔案
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -0,0 +1,83 @@
+"""
+並行壓力測試：多個執行緒共用同一個計算器（有無快取）時，帶種子的結果必須與依序計算完全相同
+執行：python -m pytest test_concurrency.py（或 python -m unittest test_concurrency）
+"""
+
+import random
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from card import ints_to_cards
+from equity_calculator import OmahaHiLoEquityCalculator, shutdown_process_pool
+from equity_cache import CachedEquityCalculator, EquityCache
+
+NUM_THREADS = 16
+NUM_DEALS = 24
+# 每個牌局重複提交的次數，讓相同的請求同時在不同執行緒中計算（快取版會同時讀寫同一個鍵）
+REPEATS = 3
+# 分片計算的測試中各牌局輪流使用的工作進程數：不同的workers同時使用常駐進程池
+SHARD_WORKERS = (2, 3)
+
+def make_deals():
+    """產生固定的測試牌局：2-4位玩家，公共牌0、3或4張，一半的牌局可自動窮舉"""
+    rng = random.Random(2024)
+    deals = []
+    for index in range(NUM_DEALS):
+        num_players = 2 + index % 3
+        board_size = (0, 3, 4)[index % 3]
+        codes = rng.sample(range(52), 5 * num_players + board_size)
+        hands = [ints_to_cards(codes[i * 5:i * 5 + 5]) for i in range(num_players)]
+        board = ints_to_cards(codes[5 * num_players:])
+        deals.append((hands, board, 400, index))
+    return deals
+
+def run(calculator, deal, workers=1):
+    hands, board, num_simulations, seed = deal
+    return calculator.calculate_equity(hands, board, num_simulations, seed=seed, workers=workers)
+
+def shard_workers(index):
+    """分片計算測試中第index個牌局使用的工作進程數"""
+    return SHARD_WORKERS[index % len(SHARD_WORKERS)]
+
+class ConcurrencyStressTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.deals = make_deals()
+        sequential_calculator = OmahaHiLoEquityCalculator()
+        cls.expected = [run(sequential_calculator, deal) for deal in cls.deals]
+        cls.expected_sharded = [run(sequential_calculator, deal, shard_workers(index))
+                                for index, deal in enumerate(cls.deals)]
+
+    @classmethod
+    def tearDownClass(cls):
+        shutdown_process_pool()
+
+    def run_concurrently(self, calculator, workers_of=lambda index: 1):
+        """以NUM_THREADS個執行緒打亂順序提交所有牌局（每個重複REPEATS次），返回 [(牌局索引, 結果)]"""
+        tasks = [index for index in range(len(self.deals)) for _ in range(REPEATS)]
+        random.Random(7).shuffle(tasks)
+        with ThreadPoolExecutor(max_workers=NUM_THREADS) as executor:
+            futures = [(index, executor.submit(run, calculator, self.deals[index], workers_of(index)))
+                       for index in tasks]
+            return [(index, future.result()) for index, future in futures]
+
+    def test_shared_calculator(self):
+        calculator = OmahaHiLoEquityCalculator()
+        for index, results in self.run_concurrently(calculator):
+            self.assertEqual(results, self.expected[index], f"牌局 {index}")
+
+    def test_shared_cached_calculator(self):
+        calculator = CachedEquityCalculator(cache=EquityCache())
+        for index, results in self.run_concurrently(calculator):
+            self.assertEqual(results, self.expected[index], f"牌局 {index}")
+        # 快取確實被並行使用：第一輪之外的請求應有命中
+        self.assertGreater(calculator.cache.hits, 0)
+
+    def test_shared_calculator_with_workers(self):
+        """不同執行緒以不同的workers同時分片到常駐進程池，進程池不會在其他呼叫提交分片時被關閉"""
+        calculator = OmahaHiLoEquityCalculator()
+        for index, results in self.run_concurrently(calculator, shard_workers):
+            self.assertEqual(results, self.expected_sharded[index], f"牌局 {index}")
+
+if __name__ == '__main__':
+    unittest.main()
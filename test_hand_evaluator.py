@@ -0,0 +1,36 @@
+"""
+牌型評估器測試：查表評估與原始評估器的一致性
+執行：python -m pytest test_hand_evaluator.py（或 python -m unittest test_hand_evaluator）
+"""
+
+import unittest
+from itertools import combinations
+from hand_evaluator import HandEvaluator
+
+class LookupParityTest(unittest.TestCase):
+    """查表後端（_lookup_high_hand）必須與原始Counter評估器（_evaluate_high_hand）完全相同"""
+
+    def test_all_five_card_hands(self):
+        """列舉全部2,598,960種5張牌組合逐一比對"""
+        lookup_high_hand = HandEvaluator._lookup_high_hand
+        evaluate_high_hand = HandEvaluator._evaluate_high_hand
+        count = 0
+        mismatches = []
+        for hand in combinations(range(52), 5):
+            count += 1
+            if lookup_high_hand(hand) != evaluate_high_hand(hand) and len(mismatches) < 10:
+                mismatches.append(hand)
+        self.assertEqual(count, 2598960)
+        self.assertEqual(mismatches, [])
+
+    def test_card_order_does_not_matter(self):
+        """查表把前2張視為手牌、後3張視為公共牌，任何排列都應得到相同結果"""
+        lookup_high_hand = HandEvaluator._lookup_high_hand
+        for hand in [(48, 49, 0, 4, 8), (0, 4, 8, 12, 48), (51, 47, 43, 39, 35), (0, 1, 2, 4, 5)]:
+            expected = HandEvaluator._evaluate_high_hand(hand)
+            for split in combinations(range(5), 2):
+                reordered = tuple(hand[i] for i in split) + tuple(hand[i] for i in range(5) if i not in split)
+                self.assertEqual(lookup_high_hand(reordered), expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,228 @@
+"""
+奧瑪哈高低牌勝率計算器 - NumPy向量化批次引擎
+一次抽出整批牌面，以陣列運算完成所有玩家的牌型評估與底池分配
+"""
+
+from itertools import combinations
+from math import comb
+from card import cards_to_ints, codes_to_mask, remaining_codes
+from hand_evaluator import (CODE_LOW_BITS, NUM_RANK_TRIPLES, FLUSH_OFFSET, RANK_PAIR_IDS, RANK_TRIPLE_IDS,
+                            get_high_rank_table, get_low_table)
+
+try:
+    import numpy as np
+except ImportError:  # numpy為可選依賴，只有此引擎需要
+    np = None
+
+# 5張牌中取3張公共牌的10種位置組合
+BOARD_TRIPLE_INDEXES = tuple(combinations(range(5), 3))
+# 無低牌時的哨兵值（大於任何低牌值，低牌值越小越好）
+NO_LOW = 2 ** 31 - 1
+
+_vector_tables = None
+
+def get_vector_tables():
+    """
+    取得向量化查找表，首次使用時建立
+    高牌表與低牌表直接包裝hand_evaluator經table_store映射的同一份檔案，不另外複製
+    
+    Returns:
+        tuple: (pair_ids, triple_ids, high_values, low_values)
+            pair_ids: 有序兩張牌面 r1*13+r2 -> 手牌牌面組合編號
+            triple_ids: 有序三張牌面 r1*169+r2*13+r3 -> 公共牌牌面組合編號
+            high_values: [是否同花, 手牌編號, 公共牌編號] 攤平後的高牌強度（無效組合為0）
+            low_values: [手牌低牌遮罩, 公共牌低牌遮罩] 攤平後的最佳低牌值，無法組成低牌為0
+    """
+    global _vector_tables
+    if _vector_tables is None:
+        _vector_tables = (np.array(RANK_PAIR_IDS, dtype=np.int64),
+                          np.array(RANK_TRIPLE_IDS, dtype=np.int64),
+                          np.frombuffer(get_high_rank_table(), dtype=np.int32),
+                          np.frombuffer(get_low_table(), dtype=np.int32))
+    return _vector_tables
+
+class VectorizedEquityCalculator:
+    """NumPy向量化的奧瑪哈高低牌勝率計算器，結果格式與OmahaHiLoEquityCalculator相同"""
+    
+    def __init__(self, batch_size=2000):
+        if np is None:
+            raise ImportError("向量化引擎需要numpy，請先執行: pip install numpy")
+        self.batch_size = batch_size
+        codes = np.arange(52)
+        self.code_suit_bits = 1 << (codes & 3)
+        self.code_low_bits = np.array(CODE_LOW_BITS, dtype=np.int64)
+    
+    def calculate_equity(self, players_hands, board_cards=None, num_simulations=10000,
+                         exact=None, exact_threshold=None, seed=None, rng=None, target_stderr=None):
+        """
+        計算多個玩家的勝率（參數與返回格式同OmahaHiLoEquityCalculator.calculate_equity）
+        
+        Args:
+            seed: 亂數種子
+            rng: 自訂的numpy.random.Generator（優先於seed）
+            target_stderr: 目標標準誤（勝率百分點），每批模擬後檢查，達標即提前停止
+        """
+        if not players_hands:
+            raise ValueError("至少需要一個玩家")
+        
+        for i, hand in enumerate(players_hands):
+            if len(hand) != 5:
+                raise ValueError(f"玩家 {i+1} 的手牌必須是5張")
+        
+        if board_cards is None:
+            board_cards = []
+        
+        if len(board_cards) > 5:
+            raise ValueError("公共牌不能超過5張")
+        
+        hands_codes = [cards_to_ints(hand) for hand in players_hands]
+        board_codes = cards_to_ints(board_cards)
+        known_codes = [code for hand in hands_codes for code in hand] + board_codes
+        dead_mask = codes_to_mask(known_codes)
+        if bin(dead_mask).count('1') != len(known_codes):
+            raise ValueError("手牌與公共牌中有重複的牌")
+        available_codes = np.array(remaining_codes(dead_mask), dtype=np.int64)
+        remaining_board = 5 - len(board_codes)
+        
+        space_size = comb(len(available_codes), remaining_board)
+        if exact is None:
+            threshold = num_simulations if exact_threshold is None else exact_threshold
+            exact = space_size <= threshold
+        num_trials = space_size if exact else num_simulations
+        
+        num_players = len(hands_codes)
+        totals = {name: np.zeros(num_players, dtype=np.int64)
+                  for name in ('hi_wins', 'lo_wins', 'scoops', 'splits', 'quarters', 'three_quarters')}
+        total_value = np.zeros(num_players, dtype=np.float64)
+        total_value_sq = np.zeros(num_players, dtype=np.float64)
+        
+        hole_pairs = self._encode_hole_pairs(hands_codes)
+        known_board = np.array(board_codes, dtype=np.int64)
+        
+        if exact:
+            all_runouts = np.array(list(combinations(available_codes.tolist(), remaining_board)),
+                                   dtype=np.int64).reshape(space_size, remaining_board)
+        if rng is None:
+            rng = np.random.default_rng(seed)
+        
+        trials_done = 0
+        for start in range(0, num_trials, self.batch_size):
+            batch = min(self.batch_size, num_trials - start)
+            if exact:
+                runouts = all_runouts[start:start + batch]
+            else:
+                # 每列獨立打亂後取前幾張，即不放回抽樣
+                order = np.argsort(rng.random((batch, len(available_codes))), axis=1)
+                runouts = available_codes[order[:, :remaining_board]]
+            boards = np.concatenate([np.broadcast_to(known_board, (batch, len(board_codes))), runouts], axis=1)
+            
+            hi, lo = self._evaluate_batch(hole_pairs, boards)
+            self._settle_batch(hi, lo, totals, total_value, total_value_sq)
+            trials_done += batch
+            
+            if not exact and target_stderr is not None and trials_done > 1:
+                if self._stderr(total_value, total_value_sq, trials_done).max() <= target_stderr:
+                    break
+        num_trials = trials_done
+        stderr = np.zeros(num_players) if exact else self._stderr(total_value, total_value_sq, num_trials)
+        
+        results = {}
+        for i in range(num_players):
+            player_stats = {name: int(counter[i]) for name, counter in totals.items()}
+            player_stats['total_value'] = float(total_value[i])
+            player_stats['hi_win_rate'] = player_stats['hi_wins'] / num_trials * 100
+            player_stats['lo_win_rate'] = player_stats['lo_wins'] / num_trials * 100
+            player_stats['scoop_rate'] = player_stats['scoops'] / num_trials * 100
+            player_stats['split_rate'] = player_stats['splits'] / num_trials * 100
+            player_stats['quarter_rate'] = player_stats['quarters'] / num_trials * 100
+            player_stats['three_quarter_rate'] = player_stats['three_quarters'] / num_trials * 100
+            player_stats['equity'] = player_stats['total_value'] / num_trials * 100
+            player_stats['trials'] = num_trials
+            player_stats['exact'] = exact
+            player_stats['equity_stderr'] = float(stderr[i])
+            results[f'player_{i+1}'] = player_stats
+        
+        return results
+    
+    def _encode_hole_pairs(self, hands_codes):
+        """
+        每位玩家10組兩張手牌的牌面組合編號與花色位元，形狀皆為 (玩家數, 10)；
+        以及整手牌的低牌遮罩左移8位，形狀為 (玩家數,)
+        """
+        pair_ids = get_vector_tables()[0]
+        pairs = np.array([list(combinations(hand, 2)) for hand in hands_codes], dtype=np.int64)
+        first, second = pairs[..., 0], pairs[..., 1]
+        rank_ids = pair_ids[(first >> 2) * 13 + (second >> 2)]
+        suit_bits = self.code_suit_bits[first] & self.code_suit_bits[second]
+        low_masks = np.bitwise_or.reduce(self.code_low_bits[np.array(hands_codes, dtype=np.int64)], axis=1)
+        return rank_ids, suit_bits, low_masks << 8
+    
+    def _evaluate_batch(self, hole_pairs, boards):
+        """
+        評估一批完整牌面
+        返回 (hi, lo)，形狀皆為 (牌面數, 玩家數)；lo為最佳低牌值（越小越好），無低牌為NO_LOW
+        """
+        _, triple_ids, high_values, low_values = get_vector_tables()
+        pair_ids, pair_suits, hole_lows = hole_pairs
+        
+        triples = boards[:, BOARD_TRIPLE_INDEXES]  # (牌面數, 10, 3)
+        ranks = triples >> 2
+        triple_rank_ids = triple_ids[ranks[..., 0] * 169 + ranks[..., 1] * 13 + ranks[..., 2]]
+        suit_bits = self.code_suit_bits[triples]
+        triple_suits = suit_bits[..., 0] & suit_bits[..., 1] & suit_bits[..., 2]
+        board_lows = np.bitwise_or.reduce(self.code_low_bits[boards], axis=1)
+        
+        # 廣播為 (牌面數, 玩家數, 10手牌組合, 10公共牌組合)，同花時查表偏移到同花區段
+        is_flush = (pair_suits[None, :, :, None] & triple_suits[:, None, None, :]) != 0
+        index = (is_flush * FLUSH_OFFSET
+                 + pair_ids[None, :, :, None] * NUM_RANK_TRIPLES + triple_rank_ids[:, None, None, :])
+        hi = high_values[index].max(axis=(2, 3))
+        
+        # 低牌只取決於整手牌與整個牌面的低牌牌面集合，每位玩家查表一次
+        lo = low_values[hole_lows[None, :] | board_lows[:, None]]
+        lo = np.where(lo == 0, NO_LOW, lo)
+        
+        return hi, lo
+    
+    @staticmethod
+    def _stderr(total_value, total_value_sq, num_trials):
+        """各玩家勝率（百分比）的標準誤"""
+        if num_trials < 2:
+            return np.zeros_like(total_value)
+        mean = total_value / num_trials
+        variance = np.maximum(total_value_sq / num_trials - mean * mean, 0.0)
+        return np.sqrt(variance / (num_trials - 1)) * 100
+    
+    @staticmethod
+    def _settle_batch(hi, lo, totals, total_value, total_value_sq):
+        """依OmahaHiLoEquityCalculator._settle_board的規則，以陣列運算累加整批牌面的底池分配"""
+        hi_win = hi == hi.max(axis=1, keepdims=True)
+        best_lo = lo.min(axis=1, keepdims=True)
+        has_low = best_lo < NO_LOW
+        lo_win = (lo == best_lo) & has_low
+        
+        hi_count = hi_win.sum(axis=1, keepdims=True)
+        lo_count = np.maximum(lo_win.sum(axis=1, keepdims=True), 1)
+        hi_pot = np.where(has_low, 0.5, 1.0)
+        lo_pot = np.where(has_low, 0.5, 0.0)
+        pot_share = np.where(hi_win, hi_pot / hi_count, 0.0) + np.where(lo_win, lo_pot / lo_count, 0.0)
+        
+        hi_only = hi_win & ~lo_win
+        lo_only = lo_win & ~hi_win
+        scoops = (hi_win & lo_win) | (hi_only & (hi_count == 1) & ~has_low)
+        splits = ((hi_only & (hi_count == 1) & has_low)
+                  | (hi_only & (hi_count == 2) & ~has_low)
+                  | (lo_only & (lo_count == 1)))
+        quarters = ((hi_only & (hi_count > 1) & has_low)
+                    | (hi_only & (hi_count > 2) & ~has_low)
+                    | (lo_only & (lo_count > 1)))
+        three_quarters = (pot_share > 0.5) & (pot_share <= 0.75)
+        
+        totals['hi_wins'] += hi_win.sum(axis=0)
+        totals['lo_wins'] += lo_win.sum(axis=0)
+        totals['scoops'] += scoops.sum(axis=0)
+        totals['splits'] += splits.sum(axis=0)
+        totals['quarters'] += quarters.sum(axis=0)
+        totals['three_quarters'] += three_quarters.sum(axis=0)
+        total_value += pot_share.sum(axis=0)
+        total_value_sq += (pot_share * pot_share).sum(axis=0)
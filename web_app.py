@@ -3,87 +3,353 @@
 使用Flask創建適合手機使用的網頁界面
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 import json
+import os
 from equity_calculator import OmahaHiLoEquityCalculator
+from equity_cache import EquityCache, CachedEquityCalculator
+from equity_jobs import EquityJob, EquityJobManager, QueueFullError
 from card import Card, parse_cards
+from hand_range import HandRange, parse_hand_or_range
 
 app = Flask(__name__)
-calculator = OmahaHiLoEquityCalculator()
+# 結果快取：設定EQUITY_CACHE_DB時另外寫入SQLite，重啟後保留並由多個工作進程共用
+calculator = CachedEquityCalculator(
+    OmahaHiLoEquityCalculator(),
+    EquityCache(max_entries=int(os.environ.get('EQUITY_CACHE_SIZE', 4096)),
+                db_path=os.environ.get('EQUITY_CACHE_DB'))
+)
+# 每次計算的時間上限（毫秒），請求可指定更短的time_budget_ms
+MAX_TIME_BUDGET_MS = int(os.environ.get('EQUITY_TIME_BUDGET_MS', 30000))
+# 批次計算：單次請求的工作數上限與使用的工作進程數
+BATCH_MAX_JOBS = int(os.environ.get('EQUITY_BATCH_MAX_JOBS', 5000))
+BATCH_WORKERS = int(os.environ.get('EQUITY_BATCH_WORKERS', os.cpu_count() or 1))
+# 背景計算工作：限制同時執行與排隊中的工作數
+job_manager = EquityJobManager(
+    calculator,
+    max_workers=int(os.environ.get('EQUITY_JOB_WORKERS', 2)),
+    max_queue=int(os.environ.get('EQUITY_JOB_QUEUE', 32))
+)
 
 @app.route('/')
 def index():
     """主頁面"""
     return render_template('index.html')
 
+def parse_calculate_request(data):
+    """
+    解析並驗證計算請求，格式錯誤時拋出ValueError（訊息可直接回傳給使用者）
+    
+    Returns:
+        dict: players_hands、board_cards、num_simulations以及傳給calculate_equity的seed、target_stderr、time_budget_ms
+    """
+    if not isinstance(data, dict):
+        raise ValueError('請求必須是JSON物件')
+    
+    # 解析玩家手牌：5張確定的牌，或範圍語法（例如 "AA2xx ds, A23xx:0.5"）
+    players_hands = []
+    hand_strs = data.get('players_hands', [])
+    if not isinstance(hand_strs, list):
+        raise ValueError('players_hands必須是字串列表')
+    for i, hand_str in enumerate(hand_strs):
+        if not isinstance(hand_str, str):
+            raise ValueError(f'玩家{i+1}的手牌必須是字串')
+        if hand_str.strip():
+            try:
+                hand = parse_hand_or_range(hand_str.strip())
+            except Exception as e:
+                raise ValueError(f'玩家{i+1}的手牌格式錯誤: {str(e)}')
+            players_hands.append(hand)
+    
+    if len(players_hands) < 2:
+        raise ValueError('至少需要2個玩家')
+    
+    # 解析公共牌
+    board_cards = []
+    board_str = data.get('board_cards', '')
+    if not isinstance(board_str, str):
+        raise ValueError('公共牌必須是字串')
+    board_str = board_str.strip()
+    if board_str:
+        try:
+            board_cards = parse_cards(board_str)
+        except Exception as e:
+            raise ValueError(f'公共牌格式錯誤: {str(e)}')
+        if len(board_cards) > 5:
+            raise ValueError('公共牌不能超過5張')
+    
+    all_cards = [str(card) for hand in players_hands if not isinstance(hand, HandRange) for card in hand]
+    all_cards += [str(card) for card in board_cards]
+    if len(set(all_cards)) != len(all_cards):
+        raise ValueError('手牌與公共牌中有重複的牌')
+    
+    # 獲取模擬次數
+    simulations = data.get('simulations', 10000)
+    if not isinstance(simulations, int) or isinstance(simulations, bool):
+        raise ValueError('模擬次數必須是整數')
+    if simulations < 1000 or simulations > 50000:
+        simulations = 10000
+    
+    # 可選的亂數種子，用於重現結果
+    seed = data.get('seed')
+    if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool)):
+        raise ValueError('亂數種子必須是整數')
+    
+    # 可選的目標標準誤（百分點），達標即提前停止模擬
+    target_stderr = data.get('target_stderr')
+    if target_stderr is not None and (not isinstance(target_stderr, (int, float)) or isinstance(target_stderr, bool)
+                                      or target_stderr <= 0):
+        raise ValueError('目標標準誤必須是正數')
+    
+    # 可選的時間上限（毫秒），超過即返回目前的估計；不超過伺服器設定的上限
+    time_budget_ms = data.get('time_budget_ms', MAX_TIME_BUDGET_MS)
+    if not isinstance(time_budget_ms, (int, float)) or isinstance(time_budget_ms, bool) or time_budget_ms <= 0:
+        raise ValueError('時間上限必須是正數（毫秒）')
+    time_budget_ms = min(time_budget_ms, MAX_TIME_BUDGET_MS)
+    
+    return {
+        'players_hands': players_hands,
+        'board_cards': board_cards,
+        'num_simulations': simulations,
+        'seed': seed,
+        'target_stderr': target_stderr,
+        'time_budget_ms': time_budget_ms,
+    }
+
+def format_hand(hand):
+    """手牌或範圍的顯示文字"""
+    if isinstance(hand, HandRange):
+        return str(hand)
+    return ' '.join([str(card) for card in hand])
+
+def format_results(results, players_hands):
+    """將calculate_equity的結果格式化為API回應"""
+    first_stats = next(iter(results.values()))
+    formatted_results = {
+        'simulations': first_stats['trials'],
+        'exact': first_stats['exact'],
+        'players': []
+    }
+    
+    for i, (player_name, stats) in enumerate(results.items()):
+        formatted_results['players'].append({
+            'player': f'玩家{i+1}',
+            'hand': format_hand(players_hands[i]),
+            'equity': round(stats['equity'], 2),
+            'equity_stderr': round(stats['equity_stderr'], 3),
+            'hi_win_rate': round(stats['hi_win_rate'], 2),
+            'lo_win_rate': round(stats['lo_win_rate'], 2),
+            'scoop_rate': round(stats['scoop_rate'], 2),
+            'split_rate': round(stats['split_rate'], 2)
+        })
+    
+    return formatted_results
+
 @app.route('/api/calculate', methods=['POST'])
 def calculate_equity():
-    """計算勝率API"""
+    """計算勝率API（同步，計算完成才返回）"""
     try:
-        data = request.get_json()
+        try:
+            params = parse_calculate_request(request.get_json())
+            # 計算勝率（輸入在計算器中才能發現的問題，例如範圍與其他玩家的牌衝突，也是400）
+            results = calculator.calculate_equity(**params)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # 解析玩家手牌
-        players_hands = []
-        for i, hand_str in enumerate(data.get('players_hands', [])):
-            if hand_str.strip():
-                try:
-                    hand = parse_cards(hand_str.strip())
-                    if len(hand) != 5:
-                        return jsonify({
-                            'error': f'玩家{i+1}的手牌必須是5張，目前是{len(hand)}張'
-                        }), 400
-                    players_hands.append(hand)
-                except Exception as e:
-                    return jsonify({
-                        'error': f'玩家{i+1}的手牌格式錯誤: {str(e)}'
-                    }), 400
-        
-        if len(players_hands) < 2:
-            return jsonify({'error': '至少需要2個玩家'}), 400
+        return jsonify(format_results(results, params['players_hands']))
+    
+    except Exception as e:
+        return jsonify({'error': f'計算錯誤: {str(e)}'}), 500
+
+@app.route('/api/calculate_trajectory', methods=['POST'])
+def calculate_trajectory():
+    """逐街勝率API：翻牌前以及已知的翻牌、轉牌、河牌各一組結果，各街共用同一次模擬"""
+    try:
+        try:
+            params = parse_calculate_request(request.get_json())
+            trajectory = calculator.calculate_equity_trajectory(params['players_hands'], params['board_cards'],
+                                                                params['num_simulations'], seed=params['seed'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # 解析公共牌
-        board_cards = []
-        board_str = data.get('board_cards', '').strip()
-        if board_str:
-            try:
-                board_cards = parse_cards(board_str)
-                if len(board_cards) > 5:
-                    return jsonify({'error': '公共牌不能超過5張'}), 400
-            except Exception as e:
-                return jsonify({'error': f'公共牌格式錯誤: {str(e)}'}), 400
+        return jsonify({
+            'streets': [
+                dict(format_results(entry['results'], params['players_hands']),
+                     street=entry['street'], board=format_hand(entry['board']))
+                for entry in trajectory
+            ]
+        })
+    
+    except Exception as e:
+        return jsonify({'error': f'計算錯誤: {str(e)}'}), 500
+
+@app.route('/api/calculate/stream', methods=['POST'])
+def calculate_equity_stream():
+    """
+    串流計算勝率API（Server-Sent Events）：參數同/api/calculate，另可指定snapshot_every（每幾次模擬推送一次）
+    每批推送progress事件（進度與目前勝率），完成時推送result事件；客戶端中途斷線即停止計算
+    """
+    try:
+        data = request.get_json()
+        try:
+            params = parse_calculate_request(data)
+            snapshot_every = data.get('snapshot_every', 1000)
+            if not isinstance(snapshot_every, int) or snapshot_every < 100:
+                snapshot_every = 1000
+            # iter_equity在呼叫時即驗證輸入
+            snapshots = calculator.iter_equity(batch_size=snapshot_every, **params)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # 獲取模擬次數
-        simulations = data.get('simulations', 10000)
-        if simulations < 1000 or simulations > 50000:
-            simulations = 10000
+        players_hands = params['players_hands']
+    except Exception as e:
+        return jsonify({'error': f'計算錯誤: {str(e)}'}), 500
+    
+    def events():
+        try:
+            results = None
+            for trials_done, total_trials, results in snapshots:
+                yield sse_event('progress', {
+                    'trials_done': trials_done,
+                    'total_trials': total_trials,
+                    'equities': [round(stats['equity'], 2) for stats in results.values()]
+                })
+            yield sse_event('result', format_results(results, players_hands))
+        except Exception as e:
+            yield sse_event('error', {'error': f'計算錯誤: {str(e)}'})
+        finally:
+            snapshots.close()
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def sse_event(event, data):
+    """組成一則Server-Sent Events訊息"""
+    return f'event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+@app.route('/api/calculate_batch', methods=['POST'])
+def calculate_batch():
+    """
+    批次計算勝率API
+    請求為 {"jobs": [...]}，或NDJSON（Content-Type: application/x-ndjson，每行一個工作），每個工作的欄位同/api/calculate；
+    可選的查詢參數target_stderr套用到所有工作
+    回應依輸入順序：預設為 {"results": [...]}，Accept含application/x-ndjson時逐行串流，每行一個結果；
+    格式錯誤的工作在其位置返回 {"error": ...}，不影響其他工作
+    """
+    try:
+        if request.mimetype == 'application/x-ndjson':
+            raw_jobs = []
+            for line in request.get_data(as_text=True).splitlines():
+                if line.strip():
+                    try:
+                        raw_jobs.append(json.loads(line))
+                    except ValueError:
+                        raw_jobs.append(None)
+        else:
+            data = request.get_json()
+            raw_jobs = data.get('jobs', []) if isinstance(data, dict) else None
+            if not isinstance(raw_jobs, list):
+                return jsonify({'error': 'jobs必須是工作列表'}), 400
         
-        # 計算勝率
-        results = calculator.calculate_equity(players_hands, board_cards, simulations)
+        if len(raw_jobs) > BATCH_MAX_JOBS:
+            return jsonify({'error': f'單次批次最多{BATCH_MAX_JOBS}個工作'}), 400
         
-        # 格式化結果
-        formatted_results = {
-            'simulations': simulations,
-            'players': []
-        }
+        target_stderr = request.args.get('target_stderr', type=float)
+        if target_stderr is not None and target_stderr <= 0:
+            return jsonify({'error': '目標標準誤必須是正數'}), 400
         
-        for i, (player_name, stats) in enumerate(results.items()):
-            if player_name == 'simulations':
+        # 逐一解析，格式錯誤的工作只記錄錯誤訊息
+        errors = {}
+        jobs = []
+        players_hands = []
+        for index, raw_job in enumerate(raw_jobs):
+            try:
+                if not isinstance(raw_job, dict):
+                    raise ValueError('工作必須是JSON物件')
+                params = parse_calculate_request(raw_job)
+            except ValueError as e:
+                errors[index] = str(e)
                 continue
-            formatted_results['players'].append({
-                'player': f'玩家{i+1}',
-                'hand': ' '.join([str(card) for card in players_hands[i]]),
-                'equity': round(stats['equity'], 2),
-                'hi_win_rate': round(stats['hi_win_rate'], 2),
-                'lo_win_rate': round(stats['lo_win_rate'], 2),
-                'scoop_rate': round(stats['scoop_rate'], 2),
-                'split_rate': round(stats['split_rate'], 2)
-            })
+            jobs.append((params['players_hands'], params['board_cards'], params['num_simulations'], params['seed']))
+            players_hands.append(params['players_hands'])
         
-        return jsonify(formatted_results)
+        batch_results = calculator.iter_equity_batch(jobs, workers=BATCH_WORKERS, target_stderr=target_stderr,
+                                                     time_budget_ms=MAX_TIME_BUDGET_MS)
+    except Exception as e:
+        return jsonify({'error': f'計算錯誤: {str(e)}'}), 500
+    
+    def results():
+        job_index = 0
+        for index in range(len(raw_jobs)):
+            if index in errors:
+                yield {'error': errors[index]}
+            else:
+                result = next(batch_results)
+                yield result if 'error' in result else format_results(result, players_hands[job_index])
+                job_index += 1
+    
+    if 'application/x-ndjson' in request.headers.get('Accept', ''):
+        def lines():
+            try:
+                for result in results():
+                    yield json.dumps(result, ensure_ascii=False) + '\n'
+            except Exception as e:
+                yield json.dumps({'error': f'計算錯誤: {str(e)}'}, ensure_ascii=False) + '\n'
+            finally:
+                batch_results.close()
+        return Response(stream_with_context(lines()), mimetype='application/x-ndjson')
+    
+    try:
+        return jsonify({'results': list(results())})
+    except Exception as e:
+        return jsonify({'error': f'計算錯誤: {str(e)}'}), 500
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """提交背景計算工作API：參數同/api/calculate，立即返回工作編號"""
+    try:
+        try:
+            params = parse_calculate_request(request.get_json())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
+        job = job_manager.submit(**params)
+        return jsonify({'job_id': job.job_id, 'status': job.status}), 202
+    
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': f'計算錯誤: {str(e)}'}), 500
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """查詢背景計算工作API：返回狀態、進度、目前的勝率，完成（或取消後）附上結果"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': '找不到此計算工作'}), 404
+    
+    response = {
+        'job_id': job.job_id,
+        'status': job.status,
+        'trials_done': job.trials_done,
+        'total_trials': job.total_trials,
+    }
+    if job.partial_equities is not None:
+        response['partial_equities'] = [round(equity, 2) for equity in job.partial_equities]
+    if job.result is not None:
+        response['result'] = format_results(job.result, job.players_hands)
+    elif job.status == EquityJob.FAILED:
+        response['error'] = f'計算錯誤: {job.error}'
+    return jsonify(response)
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """取消背景計算工作API：已開始的工作保留取消前完成部分的結果"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({'error': '找不到此計算工作'}), 404
+    return jsonify({'job_id': job.job_id, 'status': job.status})
+
 @app.route('/api/analyze_hand', methods=['POST'])
 def analyze_hand():
     """分析單手牌強度API"""